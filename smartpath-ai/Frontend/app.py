@@ -65,6 +65,51 @@ if 'cv_analyzed' not in st.session_state:
 if 'user_name' not in st.session_state:
     st.session_state.user_name = ""
 
+def stream_chat_response(chat_data, placeholder):
+    """
+    Stream an answer from the /chat/stream endpoint, rendering it into
+    placeholder as tokens arrive
+
+    chat_data holds the same form fields as a /chat request. Returns the
+    final response data ({"success", "response", ...}), or None when the
+    server does not offer streaming
+    """
+    user_html = f'<div class="chat-message user-message"><strong>You:</strong> {chat_data["message"]}</div>'
+
+    def render(text, cursor=""):
+        placeholder.markdown(
+            user_html + f'<div class="chat-message ai-message"><strong>🤖 SmartPath AI:</strong> {text}{cursor}</div>',
+            unsafe_allow_html=True)
+
+    text = ""
+    try:
+        with requests.post("http://localhost:51690/chat/stream", data=chat_data, stream=True, timeout=120) as r:
+            if r.status_code in (404, 405):
+                return None
+            r.raise_for_status()
+
+            event = None
+            for line in r.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "token":
+                        text += data["text"]
+                        render(text, "▌")
+                    elif event in ("done", "error"):
+                        # Replace the streamed text and its cursor with the final answer or the error
+                        render(data.get("response") or text)
+                        return data
+    except Exception:
+        if text:
+            render(text)
+        raise
+
+    data = {"success": False, "response": text or "The response stream ended unexpectedly"}
+    render(data["response"])
+    return data
+
 # CV Analysis Page
 if page == "📄 CV Analysis":
     st.header("📄 CV Analysis & Job Matching")
@@ -338,74 +383,104 @@ elif page == "💬 AI Chat Assistant":
         speak_response = st.checkbox("🔊 Speak", value=True)
 
     if st.button("💬 Ask AI", type="primary") and user_question:
-        with st.spinner("🤖 Thinking..."):
-            try:
-                # Use database server on port 49484 with session tracking
-                chat_data = {
-                    "message": user_question,
-                    "user_name": st.session_state.get('user_name', 'Anonymous'),
-                    "session_id": st.session_state.get('chat_session_id', None)
-                }
-
-                chat_r = requests.post("http://localhost:51690/chat", data=chat_data)
-
-                if chat_r.status_code == 200:
-                    response_data = chat_r.json()
-
-                    # Check if database server responded successfully
-                    if response_data.get("success", True):
-                        ai_response = response_data.get("ai_response", "No response")
-                        session_id = response_data.get("session_id")
-                        message_number = response_data.get("message_number", 1)
-                        category = response_data.get("category", "general")
-                        response_time = response_data.get("response_time_ms", 0)
-
-                        # Store session ID for future messages
-                        if session_id:
-                            st.session_state.chat_session_id = session_id
-
-                        # Display conversation with database info
-                        st.markdown(f'<div class="chat-message user-message"><strong>You:</strong> {user_question}</div>',
-                                  unsafe_allow_html=True)
-                        st.markdown(f'<div class="chat-message ai-message"><strong>🤖 SmartPath AI:</strong> {ai_response}</div>',
-                                  unsafe_allow_html=True)
-
-                        # Show database status
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.success("✅ Message Saved to Database")
-                        with col2:
-                            st.info(f"📊 Category: {category.title()}")
-                        with col3:
-                            st.info(f"⚡ Response: {response_time}ms")
-
-                        # Simple speak button without HTML components
-                        if st.button("🔊 Speak Response", key=f"speak_response_{message_number}"):
-                            st.info("🔊 Text-to-speech would play here (browser TTS)")
-
-                        # Auto-speak notification
-                        if speak_response:
-                            st.info("🔊 Auto-speak enabled for responses")
-
-                        # Add to session history (local display)
-                        st.session_state.chat_history.append({
-                            "question": user_question,
-                            "answer": ai_response,
-                            "category": category,
-                            "session_id": session_id,
-                            "message_number": message_number
-                        })
-
-                        # Clear the current question
-                        if 'current_question' in st.session_state:
-                            del st.session_state.current_question
+        # Stream the answer token by token when the server supports it
+        # Use database server on port 49484 with session tracking
+        chat_data = {
+            "message": user_question,
+            "user_name": st.session_state.get('user_name', 'Anonymous'),
+            "session_id": st.session_state.get('chat_session_id', None),
+            "speak_response": str(speak_response).lower()
+        }
+        answer_placeholder = st.empty()
+        try:
+            stream_data = stream_chat_response(chat_data, answer_placeholder)
+        except Exception as e:
+            stream_data = {"success": False, "response": f"Chat error: {str(e)}"}
+
+        if stream_data is None:
+            # Server without streaming: wait for the complete answer
+            with st.spinner("🤖 Thinking..."):
+                try:
+                    chat_r = requests.post("http://localhost:51690/chat", data=chat_data)
+
+                    if chat_r.status_code == 200:
+                        response_data = chat_r.json()
+
+                        # Check if database server responded successfully
+                        if response_data.get("success", True):
+                            ai_response = response_data.get("ai_response", "No response")
+                            session_id = response_data.get("session_id")
+                            message_number = response_data.get("message_number", 1)
+                            category = response_data.get("category", "general")
+                            response_time = response_data.get("response_time_ms", 0)
+
+                            # Store session ID for future messages
+                            if session_id:
+                                st.session_state.chat_session_id = session_id
+
+                            # Display conversation with database info
+                            st.markdown(f'<div class="chat-message user-message"><strong>You:</strong> {user_question}</div>',
+                                      unsafe_allow_html=True)
+                            st.markdown(f'<div class="chat-message ai-message"><strong>🤖 SmartPath AI:</strong> {ai_response}</div>',
+                                      unsafe_allow_html=True)
+
+                            # Show database status
+                            col1, col2, col3 = st.columns(3)
+                            with col1:
+                                st.success("✅ Message Saved to Database")
+                            with col2:
+                                st.info(f"📊 Category: {category.title()}")
+                            with col3:
+                                st.info(f"⚡ Response: {response_time}ms")
+
+                            # Simple speak button without HTML components
+                            if st.button("🔊 Speak Response", key=f"speak_response_{message_number}"):
+                                st.info("🔊 Text-to-speech would play here (browser TTS)")
+
+                            # Auto-speak notification
+                            if speak_response:
+                                st.info("🔊 Auto-speak enabled for responses")
+
+                            # Add to session history (local display)
+                            st.session_state.chat_history.append({
+                                "question": user_question,
+                                "answer": ai_response,
+                                "category": category,
+                                "session_id": session_id,
+                                "message_number": message_number
+                            })
+
+                            # Clear the current question
+                            if 'current_question' in st.session_state:
+                                del st.session_state.current_question
+                        else:
+                            st.error(f"AI Error: {response_data.get('ai_response', 'Unknown error')}")
                     else:
-                        st.error(f"AI Error: {response_data.get('ai_response', 'Unknown error')}")
-                else:
-                    st.error(f"Failed to get AI response. Status: {chat_r.status_code}")
+                        st.error(f"Failed to get AI response. Status: {chat_r.status_code}")
 
-            except Exception as e:
-                st.error(f"Chat error: {str(e)}")
+                except Exception as e:
+                    st.error(f"Chat error: {str(e)}")
+        elif stream_data.get("success"):
+            ai_response = stream_data["response"]
+
+            # Auto-speak notification
+            if speak_response:
+                st.info("🔊 Auto-speak enabled for responses")
+
+            # Add to session history (local display); the server has saved it to its chat history
+            st.session_state.chat_history.append({
+                "question": user_question,
+                "answer": ai_response,
+                "category": "general",
+                "session_id": st.session_state.get('chat_session_id'),
+                "message_number": len(st.session_state.chat_history) + 1
+            })
+
+            # Clear the current question
+            if 'current_question' in st.session_state:
+                del st.session_state.current_question
+        else:
+            st.error(f"AI Error: {stream_data.get('response', 'Unknown error')}")
 
     # Display chat history
     if st.session_state.chat_history:
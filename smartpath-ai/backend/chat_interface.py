@@ -4,9 +4,10 @@ Chat Interface module for SmartPath AI
 Provides conversational AI capabilities using Google Gemini
 """
 import logging
-from typing import List, Dict, Optional
-from config import GOOGLE_API_KEY, GEMINI_MODEL
+from typing import Iterator, List, Dict, Optional
+from config import GOOGLE_API_KEY
 from text_to_speech import speak_text, is_tts_available
+from llm_gateway import EmptyResponseError, generate, generate_stream
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -68,78 +69,95 @@ class SmartPathChatBot:
             Dict with response, success status, and metadata
         """
         try:
-            # Try to import Google AI with better error handling
-            try:
-                import google.generativeai as genai
-                logger.info("✅ google.generativeai imported successfully")
-            except ImportError as import_err:
-                logger.error(f"❌ Failed to import google.generativeai: {import_err}")
-                # Try alternative import paths
-                import sys
-                sys.path.append('.')
-                sys.path.append('..')
-                try:
-                    import google.generativeai as genai
-                    logger.info("✅ google.generativeai imported on retry")
-                except ImportError:
-                    raise ImportError("google.generativeai module not found. Please install with: pip install google-generativeai")
-
-            # Check if API key is available
-            if not GOOGLE_API_KEY or GOOGLE_API_KEY == "your_api_key_here":
-                raise ValueError("Google API key not configured")
-
-            genai.configure(api_key=GOOGLE_API_KEY)
-            model = genai.GenerativeModel(GEMINI_MODEL)
-            logger.info("✅ Google AI model configured successfully")
-            
-            # Build context-aware prompt
-            context_info = self._build_context_prompt()
-            
-            full_prompt = f"""
-            {self.system_prompt}
-            
-            Context Information:
-            {context_info}
-            
-            Conversation History:
-            {self._format_conversation_history()}
-            
-            User Question: {user_message}
-            
-            Please provide a helpful, specific response. Keep it conversational and under 200 words.
-            If the user asks about their CV analysis, job matches, or skills, use the context information provided.
-            """
+            full_prompt, context_info = self._build_prompt(user_message)
             
             # Generate response
-            response = model.generate_content(full_prompt)
-            ai_response = response.text.strip()
-            
-            # Add to conversation history
-            self.conversation_history.append({
-                "user": user_message,
-                "assistant": ai_response,
-                "timestamp": self._get_timestamp()
-            })
+            ai_response = generate(full_prompt, "chat").strip()
             
-            # Limit conversation history to last 10 exchanges
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
+            return self._finish_response(user_message, ai_response, context_info, speak_response, language)
             
-            # Speak response if requested
-            if speak_response and is_tts_available():
-                speak_text(ai_response, language, async_mode=True)
+        except Exception as e:
+            return self._error_response(e)
+    
+    def chat_stream(self, user_message: str, speak_response: bool = False, language: str = "en") -> Iterator[Dict]:
+        """
+        Streaming variant of chat(): yields the response as it is generated
+        
+        Yields:
+            {"event": "token", "text": ...} for every chunk of the response,
+            then one {"event": "done", ...} with the same fields chat()
+            returns (the full response is added to the history at that point),
+            or {"event": "error", ...} if generation failed
+        """
+        try:
+            full_prompt, context_info = self._build_prompt(user_message)
             
-            logger.info(f"Chat response generated for: {user_message[:50]}...")
+            chunks = []
+            for text in generate_stream(full_prompt, "chat"):
+                chunks.append(text)
+                yield {"event": "token", "text": text}
             
-            return {
-                "success": True,
-                "response": ai_response,
-                "spoken": speak_response and is_tts_available(),
-                "language": language,
-                "context_used": bool(context_info.strip())
-            }
+            ai_response = "".join(chunks).strip()
+            yield {"event": "done", **self._finish_response(user_message, ai_response, context_info, speak_response, language)}
             
-        except ImportError as e:
+        except Exception as e:
+            yield {"event": "error", **self._error_response(e)}
+    
+    def _build_prompt(self, user_message: str):
+        """Build the context-aware prompt; returns (prompt, context information)"""
+        # Check if API key is available
+        if not GOOGLE_API_KEY or GOOGLE_API_KEY == "your_api_key_here":
+            raise ValueError("Google API key not configured")
+        
+        context_info = self._build_context_prompt()
+        
+        full_prompt = f"""
+        {self.system_prompt}
+        
+        Context Information:
+        {context_info}
+        
+        Conversation History:
+        {self._format_conversation_history()}
+        
+        User Question: {user_message}
+        
+        Please provide a helpful, specific response. Keep it conversational and under 200 words.
+        If the user asks about their CV analysis, job matches, or skills, use the context information provided.
+        """
+        return full_prompt, context_info
+    
+    def _finish_response(self, user_message: str, ai_response: str, context_info: str,
+                         speak_response: bool, language: str) -> Dict:
+        """Record a completed exchange in the history and build the result dict"""
+        # Add to conversation history
+        self.conversation_history.append({
+            "user": user_message,
+            "assistant": ai_response,
+            "timestamp": self._get_timestamp()
+        })
+        
+        # Limit conversation history to last 10 exchanges
+        if len(self.conversation_history) > 10:
+            self.conversation_history = self.conversation_history[-10:]
+        
+        # Speak response if requested
+        if speak_response and is_tts_available():
+            speak_text(ai_response, language, async_mode=True)
+        
+        logger.info(f"Chat response generated for: {user_message[:50]}...")
+        
+        return {
+            "success": True,
+            "response": ai_response,
+            "spoken": speak_response and is_tts_available(),
+            "language": language,
+            "context_used": bool(context_info.strip())
+        }
+    
+    def _error_response(self, e: Exception) -> Dict:
+        """Result dict for a failed chat turn"""
+        if isinstance(e, ImportError):
             error_msg = f"Google AI module not found: {str(e)}. Please install google-generativeai."
             logger.error(f"Google Generative AI import error: {e}")
             return {
@@ -148,25 +166,33 @@ class SmartPathChatBot:
                 "spoken": False,
                 "error": "AI_MODULE_NOT_FOUND"
             }
-        except ValueError as e:
-            error_msg = "Google AI API key not configured properly."
-            logger.error(f"API key error: {e}")
+        if isinstance(e, EmptyResponseError):
+            error_msg = "I can't answer that question. Please try rephrasing it."
+            logger.warning(f"Chat response blocked or empty: {e}")
             return {
                 "success": False,
                 "response": error_msg,
                 "spoken": False,
-                "error": "API_KEY_ERROR"
+                "error": "EMPTY_RESPONSE"
             }
-            
-        except Exception as e:
-            error_msg = f"I'm sorry, I encountered an error processing your question. Please try again."
-            logger.error(f"Chat error: {e}")
+        if isinstance(e, ValueError):
+            error_msg = "Google AI API key not configured properly."
+            logger.error(f"API key error: {e}")
             return {
                 "success": False,
                 "response": error_msg,
                 "spoken": False,
-                "error": str(e)
+                "error": "API_KEY_ERROR"
             }
+        
+        error_msg = f"I'm sorry, I encountered an error processing your question. Please try again."
+        logger.error(f"Chat error: {e}")
+        return {
+            "success": False,
+            "response": error_msg,
+            "spoken": False,
+            "error": str(e)
+        }
     
     def _build_context_prompt(self) -> str:
         """Build context information for the AI"""
@@ -252,6 +278,15 @@ def chat_with_ai(message: str, speak_response: bool = False, language: str = "en
     """
     return chatbot.chat(message, speak_response, language)
 
+def chat_with_ai_stream(message: str, speak_response: bool = False, language: str = "en") -> Iterator[Dict]:
+    """
+    Convenience function to chat with AI, streaming the response
+    
+    Yields:
+        Token events, then a final done (or error) event; see SmartPathChatBot.chat_stream
+    """
+    return chatbot.chat_stream(message, speak_response, language)
+
 def set_chat_context(cv_text: str = None, job_matches: List = None, skills: List = None, user_name: str = None):
     """Set context for the chatbot"""
     chatbot.set_context(cv_text, job_matches, skills, user_name)
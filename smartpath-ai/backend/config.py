@@ -11,12 +11,111 @@ os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 GEMINI_MODEL = "gemini-1.5-flash"
 TEMPERATURE = 0.7
 MAX_TOKENS = 1000
+# Alternative Gemini API endpoint (REST), e.g. "http://localhost:8090" for
+# fake_gemini_server.py when load testing offline; empty uses Google's API
+GEMINI_API_ENDPOINT = os.environ.get("SMARTPATH_GEMINI_ENDPOINT", "")
+
+# LLM Gateway
+LLM_TIMEOUT = 30  # Seconds per Gemini request
+LLM_REQUEST_BUDGET = 20  # Seconds of LLM time per /match or /analyze request
+LLM_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures before failing fast
+LLM_BREAKER_RESET_TIMEOUT = 30  # Seconds before a trial call is let through
+
+# LLM Rate Limiting (client side, shared by every worker process on this host
+# through LLM_RATE_LIMIT_STATE_PATH). The defaults are the Gemini free-tier quota
+# for one API key; other hosts or programs using the same key are not counted, so
+# lower SMARTPATH_LLM_RPM to their share. Disable (SMARTPATH_LLM_RATE_LIMIT=0) or
+# raise (SMARTPATH_LLM_RPM) the limit for load tests against fake_gemini_server.py
+LLM_RATE_LIMIT_ENABLED = os.environ.get("SMARTPATH_LLM_RATE_LIMIT", "1") == "1"
+LLM_RATE_LIMIT_RPM = int(os.environ.get("SMARTPATH_LLM_RPM", "15"))  # Requests per minute, all workers together
+# Bucket levels shared by the workers; empty = each process limits itself to the full rate
+LLM_RATE_LIMIT_STATE_PATH = os.environ.get(
+    "SMARTPATH_LLM_RATE_LIMIT_STATE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache", "rate_limit.sqlite3"),
+)
+LLM_RATE_LIMIT_TPM = 1_000_000  # Prompt + output tokens per minute
+LLM_RATE_LIMIT_MAX_WAIT = 30  # Seconds a call may queue when no request deadline applies
+LLM_CALL_PRIORITIES = {  # interactive > normal > background; unlisted call types are normal
+    "chat": "interactive",
+    "test": "interactive",
+}  # Bulk work is marked background by the caller, see llm_priority() in /match/batch
+
+# LLM Response Cache
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache", "responses.sqlite3")
+LLM_CACHE_MEMORY_ENTRIES = 2048
+LLM_CACHE_MAX_ROWS = 50000  # Responses kept on disk (oldest evicted first), 0 = no cap
+LLM_CACHE_PURGE_EVERY = 256  # Expired/excess entries are purged at open and every this many writes
+LLM_CACHE_DEFAULT_TTL = 24 * 3600  # Seconds
+LLM_CACHE_TTLS = {
+    "translate": 30 * 24 * 3600,
+    "detect_language": 30 * 24 * 3600,
+    "extract_skills": 7 * 24 * 3600,
+    "clean_text": 7 * 24 * 3600,
+    "match_jobs": 24 * 3600,  # Depends on the job catalog, which changes
+    "capability": 24 * 3600,
+    "chat": 600,
+}
 
 # Application Settings
 DEFAULT_LANGUAGE = "en"
 SUPPORTED_LANGUAGES = ["en", "rw"]
 SIMILARITY_THRESHOLD = 0.3
 
+# Embedding Settings
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Load model weights at import of main.py, e.g. in a preloading parent process
+# (gunicorn --preload) so forked workers share them copy-on-write
+PRELOAD_EMBEDDING_MODEL = os.environ.get("SMARTPATH_PRELOAD_MODEL", "0") == "1"
+# Encoder backend: "torch" (reference), "torch-int8" (dynamic quantization),
+# "onnx" or "onnx-int8" (ONNX Runtime, needs the onnxruntime package)
+EMBEDDING_BACKEND = "torch"
+EMBEDDING_PARITY_CHECK = True  # Compare non-reference backends with torch at warmup
+EMBEDDING_PARITY_MIN_COSINE = 0.99
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache")
+EMBEDDING_CACHE_MAX_ROWS = 100000  # Cached vectors kept (least recently used evicted first), 0 = no cap
+
+# Job Index Settings
+JOB_INDEX_TYPE = "auto"  # "exact", "ivf", or "auto" (IVF once the corpus reaches JOB_INDEX_IVF_MIN_SIZE)
+JOB_INDEX_IVF_MIN_SIZE = 20000
+JOB_INDEX_NLIST = 0  # IVF cells, 0 = sqrt(number of jobs)
+# IVF cells scanned per query: higher = better recall, slower. 0 = JOB_INDEX_PROBE_FRACTION
+# of the cells (at least 8); recall depends on the data, check it with vector_index.recall_at_k
+JOB_INDEX_NPROBE = 0
+JOB_INDEX_PROBE_FRACTION = 0.1
+JOB_INDEX_MIN_RECALL = 0.9  # Warn at build time when sampled IVF recall@10 is below this
+JOB_INDEX_PATH = os.path.join(EMBEDDING_CACHE_DIR, "job_index.npz")
+MATCH_TOP_K = 50
+MATCH_MAX_K = 200  # Largest k a match request may ask for
+AI_RERANK_TOP_K = 20  # Embedding candidates the Gemini stage re-ranks; bounds the prompt size
+
+# Request Pipeline
+PIPELINE_MAX_CONCURRENCY = 8  # Blocking AI/model calls run at once per process
+MATCH_BATCH_SIZE = 64  # CVs encoded per worker-thread call in /match/batch
+
+# Job Catalog (shared by all backend modules)
+JOBS_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs_dataset.csv")
+# Postings added, changed or deleted through the API, applied on top of the dataset
+JOBS_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".job_catalog", "postings.sqlite3")
+JOBS_SYNC_INTERVAL = 2  # Seconds between checks for changes made by other workers
+
+# Skill Taxonomy (canonical skills, categories and aliases)
+SKILL_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.csv")
+
+# Skill Gap Analysis
+CAPABILITY_BATCH_SIZE = 10  # Jobs analyzed per Gemini call in detect_skill_gaps
+# Best-matching jobs given AI analysis per request (the batches run concurrently);
+# the rest get skill matching, so one request costs at most 2 of the RPM quota
+CAPABILITY_MAX_JOBS = 20
+
+# Long CV Chunking (MiniLM only sees the first 256 word pieces of each input)
+CV_CHUNKING_ENABLED = True
+CV_CHUNK_WORDS = 150  # ~200 word pieces, under the model limit
+CV_CHUNK_OVERLAP = 30
+CV_MAX_CHUNKS = 8  # Bounds encoder cost for very long CVs
+CV_CHUNK_POOLING = "max"  # "max" or "mean" similarity across chunks
+
 # File Processing Settings
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 SUPPORTED_FILE_TYPES = [".txt", ".pdf"]
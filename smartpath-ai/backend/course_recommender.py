@@ -1,9 +1,35 @@
 import pandas as pd
 import os
+from collections import defaultdict
+from skill_taxonomy import get_taxonomy
 
 # Get the directory of this script
 script_dir = os.path.dirname(os.path.abspath(__file__))
 courses_df = pd.read_csv(os.path.join(script_dir, "courses_dataset.csv"))
 
+def index_courses(df):
+    """
+    Group course records by the taxonomy id of their skill
+    """
+    taxonomy = get_taxonomy()
+    index = defaultdict(list)
+    for record in df.to_dict(orient="records"):
+        skill_id = taxonomy.resolve(record["skill"])
+        if skill_id is not None:
+            index[skill_id].append(record)
+    return dict(index)
+
+courses_by_skill = index_courses(courses_df)
+
 def recommend_courses(skill):
-    return courses_df[courses_df["skill"].str.contains(skill, case=False)].to_dict(orient="records")
+    """
+    Courses for a skill
+
+    Any alias of a taxonomy skill ("JS", "javascript") finds the courses
+    filed under that skill; other names fall back to a substring match on
+    the course skill.
+    """
+    skill_id = get_taxonomy().resolve(skill)
+    if skill_id in courses_by_skill:
+        return [dict(record) for record in courses_by_skill[skill_id]]
+    return courses_df[courses_df["skill"].str.contains(skill, case=False, regex=False)].to_dict(orient="records")
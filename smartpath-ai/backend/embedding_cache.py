@@ -0,0 +1,150 @@
+"""
+Persistent embedding cache for SmartPath AI
+
+Embeddings are stored per model in a SQLite table mapping a text hash to
+the float32 vector bytes. SQLite serialises writes across processes, so
+every worker (gunicorn -w N) can read and append to the same store without
+rows getting mixed up. Changing the model name or the text produces a
+different key, so stale vectors are never returned.
+
+The store is capped at max_rows vectors: once it grows past the cap, the
+least recently used vectors are evicted, so uploaded CVs do not make it
+grow without limit.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of parameters in one statement
+_BATCH = 500
+# A hit only rewrites used_at when it is older than this (seconds), so reads rarely write
+_TOUCH_INTERVAL = 3600
+# The row cap is checked every this many put_many calls
+_EVICT_EVERY = 64
+
+
+def text_hash(text):
+    """Stable content hash used as the cache key for a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite store mapping text hashes to embeddings for one model, with LRU eviction"""
+
+    def __init__(self, model_name: str, cache_dir: str, max_rows: int = 0):
+        """
+        Args:
+            model_name: Model key; each model gets its own database file
+            cache_dir: Directory holding the database
+            max_rows: Vectors kept before the least recently used are evicted (0 = no cap)
+        """
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_rows = max_rows
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.db_path = os.path.join(cache_dir, f"{slug}.sqlite3")
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._puts = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._lock:
+            self._evict()
+
+    def _conn(self):
+        """Connection for this process; a forked worker opens its own"""
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, dim INTEGER, vector BLOB, used_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)")
+            self._db.commit()
+            self._pid = os.getpid()
+        return self._db
+
+    def get_many(self, keys):
+        """
+        Look up cached embeddings
+
+        Returns:
+            List aligned with keys holding a vector or None for each miss
+        """
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._conn()
+                for start in range(0, len(keys), _BATCH):
+                    batch = keys[start:start + _BATCH]
+                    marks = ",".join("?" * len(batch))
+                    rows = db.execute(
+                        f"SELECT key, dim, vector, used_at FROM embeddings WHERE key IN ({marks})", batch
+                    ).fetchall()
+                    stale = []
+                    for key, dim, vector, used_at in rows:
+                        found[key] = np.frombuffer(vector, dtype=np.float32, count=dim).copy()
+                        if used_at < now - _TOUCH_INTERVAL:
+                            stale.append(key)
+                    if stale:
+                        db.execute(
+                            f"UPDATE embeddings SET used_at = ? WHERE key IN ({','.join('?' * len(stale))})",
+                            [now, *stale],
+                        )
+                        db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+        return [found.get(key) for key in keys]
+
+    def put_many(self, keys, embeddings):
+        """Store new embeddings (keys already present are left as they are)"""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or not len(keys):
+            return
+
+        now = time.time()
+        dim = int(embeddings.shape[1])
+        try:
+            with self._lock:
+                db = self._conn()
+                db.executemany(
+                    "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)",
+                    [(key, dim, row.tobytes(), now) for key, row in zip(keys, embeddings)],
+                )
+                db.commit()
+                self._puts += 1
+                if self._puts % _EVICT_EVERY == 0:
+                    self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    def _evict(self):
+        """Delete the least recently used vectors above max_rows (caller holds the lock)"""
+        if not self.max_rows:
+            return
+        db = self._conn()
+        excess = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_rows
+        if excess > 0:
+            db.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY used_at LIMIT ?)",
+                (excess,),
+            )
+            db.commit()
+            logger.info(f"Embedding cache evicted {excess} vectors for {self.model_name}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
@@ -0,0 +1,282 @@
+"""
+Process-wide sentence encoder provider for SmartPath AI
+
+The encoder is loaded on first use, not at import, so importing the backend
+package stays cheap. Servers call load_model() to preload weights (in the
+parent process before forking workers, so they are shared copy-on-write)
+and warmup() in each worker to pay the first forward pass before traffic.
+
+EMBEDDING_BACKEND selects the encoder implementation:
+- torch: the reference SentenceTransformer
+- torch-int8: the same model with Linear layers dynamically quantized to int8
+- onnx / onnx-int8: the transformer exported to ONNX and run with ONNX Runtime
+"""
+import functools
+import importlib.util
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from config import (
+    EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_ROWS,
+    EMBEDDING_PARITY_CHECK, EMBEDDING_PARITY_MIN_COSINE
+)
+from embedding_cache import EmbeddingCache, text_hash
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+_model = None
+_model_lock = threading.Lock()
+_embedding_cache = None
+_embedding_cache_failed = False
+_embedding_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def active_backend():
+    """
+    The configured backend, or "torch" when its optional dependency is missing
+    """
+    if EMBEDDING_BACKEND not in BACKENDS:
+        logger.warning(f"Unknown EMBEDDING_BACKEND '{EMBEDDING_BACKEND}', using torch")
+        return "torch"
+    if EMBEDDING_BACKEND.startswith("onnx") and importlib.util.find_spec("onnxruntime") is None:
+        logger.warning("onnxruntime not installed, using the torch encoder")
+        return "torch"
+    return EMBEDDING_BACKEND
+
+
+def model_key():
+    """
+    Identifies the vectors this process produces; used to key embedding caches
+    so vectors from different backends are never mixed
+    """
+    backend = active_backend()
+    return EMBEDDING_MODEL if backend == "torch" else f"{EMBEDDING_MODEL}+{backend}"
+
+
+class OnnxEncoder:
+    """
+    SentenceTransformer-compatible encoder running the exported transformer
+    with ONNX Runtime, followed by mean pooling (as all-MiniLM-L6-v2 does)
+    """
+
+    def __init__(self, model_name: str, quantize: bool = False):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        export_dir = os.path.join(EMBEDDING_CACHE_DIR, "onnx", slug)
+        model_path = os.path.join(export_dir, "model.onnx")
+        if not os.path.exists(model_path):
+            self._export(model_name, export_dir, model_path)
+
+        if quantize:
+            quantized_path = os.path.join(export_dir, "model-int8.onnx")
+            if not os.path.exists(quantized_path):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+            model_path = quantized_path
+
+        with open(os.path.join(export_dir, "max_seq_length.txt")) as f:
+            self.max_seq_length = int(f.read().strip())
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    @staticmethod
+    def _export(model_name, export_dir, model_path):
+        """One-time export of the transformer and tokenizer (needs torch)"""
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Exporting {model_name} to ONNX")
+        os.makedirs(export_dir, exist_ok=True)
+        reference = SentenceTransformer(model_name, device="cpu")
+        transformer = reference[0].auto_model.eval()
+        tokenizer = reference.tokenizer
+
+        sample = tokenizer(["SmartPath AI export"], return_tensors="pt")
+        names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        tmp_path = model_path + ".tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                tuple(sample[name] for name in names),
+                tmp_path,
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(export_dir)
+        with open(os.path.join(export_dir, "max_seq_length.txt"), "w") as f:
+            f.write(str(reference.max_seq_length))
+        os.replace(tmp_path, model_path)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        out = []
+        for start in range(0, len(sentences), batch_size):
+            batch = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {name: batch[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = batch["attention_mask"][..., None].astype(np.float32)
+            out.append((hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+
+        embeddings = np.concatenate(out).astype(np.float32) if out else np.empty((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings[0] if single else embeddings
+
+
+def _load(backend):
+    if backend.startswith("onnx"):
+        return OnnxEncoder(EMBEDDING_MODEL, quantize=backend == "onnx-int8")
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(EMBEDDING_MODEL)
+    if backend == "torch-int8":
+        import torch
+
+        model = torch.quantization.quantize_dynamic(model.to("cpu"), {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_model():
+    """Return the shared encoder, loading it on first call"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                backend = active_backend()
+                logger.info(f"Loading embedding model {EMBEDDING_MODEL} ({backend} backend)")
+                _model = _load(backend)
+    return _model
+
+
+def load_model():
+    """
+    Load model weights without running inference
+
+    Safe to call in a parent process before forking: no torch thread pools
+    are started, so forked workers do not inherit them.
+    """
+    return get_model()
+
+
+def is_loaded():
+    """Whether the model has been loaded in this process"""
+    return _model is not None
+
+
+def get_embedding_cache():
+    """Return the process-wide embedding cache, or None when caching is disabled or unavailable"""
+    global _embedding_cache, _embedding_cache_failed
+    if not EMBEDDING_CACHE_ENABLED or _embedding_cache_failed:
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None and not _embedding_cache_failed:
+                try:
+                    _embedding_cache = EmbeddingCache(model_key(), EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_ROWS)
+                except (OSError, sqlite3.Error) as e:
+                    # Encode without the cache rather than failing every request
+                    logger.warning(f"Embedding cache unavailable, encoding uncached: {e}")
+                    _embedding_cache_failed = True
+    return _embedding_cache
+
+
+def encode_texts(texts):
+    """
+    Encode texts into a contiguous matrix of L2-normalized float32 rows,
+    only running the model for texts missing from the embedding cache
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is None:
+        return _encode_with_model(texts)
+
+    keys = [text_hash(text) for text in texts]
+    cached = embedding_cache.get_many(keys)
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+
+    if missing:
+        fresh = _encode_with_model([texts[i] for i in missing])
+        embedding_cache.put_many([keys[i] for i in missing], fresh)
+        for i, vector in zip(missing, fresh):
+            cached[i] = vector
+
+    return np.ascontiguousarray(np.vstack(cached), dtype=np.float32)
+
+
+def _encode_with_model(texts):
+    embeddings = get_model().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def check_parity(texts=None):
+    """
+    Compare the active backend against the reference torch encoder
+
+    Returns:
+        Dict with the backend, minimum and mean cosine similarity between
+        reference and active embeddings, and whether it meets the threshold
+    """
+    backend = active_backend()
+    if backend == "torch":
+        return {"backend": backend, "min_cosine": 1.0, "mean_cosine": 1.0, "ok": True}
+
+    texts = texts or [
+        "Experienced Python developer with SQL and data analysis skills.",
+        "Graphic designer skilled in Photoshop, Illustrator and UI/UX design.",
+        "Customer support agent with strong communication and troubleshooting.",
+        "Electrical engineer responsible for circuit design and safety protocols.",
+    ]
+    reference = _load("torch")
+    expected = reference.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    del reference
+    actual = get_model().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+    cosines = np.sum(np.asarray(expected, dtype=np.float32) * np.asarray(actual, dtype=np.float32), axis=1)
+    result = {
+        "backend": backend,
+        "min_cosine": round(float(cosines.min()), 4),
+        "mean_cosine": round(float(cosines.mean()), 4),
+        "ok": bool(cosines.min() >= EMBEDDING_PARITY_MIN_COSINE),
+    }
+    if result["ok"]:
+        logger.info(f"Encoder parity check passed: {result}")
+    else:
+        logger.warning(f"Encoder parity below {EMBEDDING_PARITY_MIN_COSINE}: {result}")
+    return result
+
+
+def warmup():
+    """Load the model and run one forward pass so the first request is not slow"""
+    get_model().encode(["SmartPath AI warmup"], convert_to_numpy=True, normalize_embeddings=True)
+    if EMBEDDING_PARITY_CHECK and active_backend() != "torch":
+        check_parity()
+    logger.info("Embedding model warmed up")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Local Gemini stand-in for offline benchmarking and load testing
+
+Speaks the REST generateContent and streamGenerateContent APIs, so the backend talks to it through the
+normal SDK client. Set GEMINI_API_ENDPOINT in config.py (or the
+SMARTPATH_GEMINI_ENDPOINT environment variable) to its address, e.g.
+http://localhost:8090, and start it with:
+
+    python fake_gemini_server.py --port 8090 --latency-median 0.8 --latency-sigma 0.5 --error-rate 0.02
+
+Responses are canned and deterministic: the same prompt always gets the
+same text, in the format the backend parsers expect for that call (JSON job
+matches and capability analyses, comma-separated skills, language codes,
+...). Latency is drawn from a log-normal distribution and a configurable
+fraction of requests fail with 429/500/503, both from a seeded RNG.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="SmartPath AI - Fake Gemini")
+
+settings = {"latency_median": 0.5, "latency_sigma": 0.4, "error_rate": 0.0}
+rng = random.Random(0)
+stats = {"requests": 0, "errors": 0}
+
+ERRORS = [
+    (429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota)."),
+    (500, "INTERNAL", "An internal error has occurred."),
+    (503, "UNAVAILABLE", "The model is overloaded. Please try again later."),
+]
+
+CHAT_REPLIES = [
+    "Based on your profile, focus on strengthening your core technical skills and build a small portfolio "
+    "project that shows them. Short online courses are a quick way to close the gaps in your top job matches.",
+    "Your experience transfers well to several of the roles you matched. Highlight measurable achievements "
+    "on your CV and practice explaining them; that is what most employers look for first.",
+    "Start with the job where your capability score is highest, apply there first, and use the missing skills "
+    "list as a learning plan for the next few weeks.",
+]
+
+
+def _seed(*parts):
+    """Stable integer derived from the given strings"""
+    return int(hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16], 16)
+
+
+def _score(prompt, title, low=30, high=95):
+    return low + _seed(prompt, title) % (high - low + 1)
+
+
+def _split_skills(required):
+    return [s.strip() for s in re.split(r"[;,]", required) if s.strip()]
+
+
+def _capability(prompt, title, required_skills):
+    """Canned capability analysis: a deterministic subset of the required skills is 'had'"""
+    skills = _split_skills(required_skills)
+    have = [s for s in skills if _seed(prompt, title, s) % 2 == 0]
+    missing = [s for s in skills if s not in have]
+    coverage = len(have) / len(skills) if skills else 0.5
+    return {
+        "have_skills": have,
+        "missing_skills": missing,
+        "transferable_skills": ["Communication", "Problem Solving"],
+        "capability_score": min(100, int(20 + 70 * coverage) + _seed(prompt, title) % 10),
+        "reasoning": f"Has {len(have)} of {len(skills)} required skills for {title}.",
+    }
+
+
+def canned_response(prompt):
+    """Response text for a prompt, in the format the calling backend module expects"""
+    if "Candidate Jobs:" in prompt:
+        titles = re.findall(r"^\s*- ([^:\n]+): .*\(Required skills:", prompt, re.MULTILINE)
+        return json.dumps([{"title": t.strip(), "score": _score(prompt, t)} for t in titles])
+
+    if "for EACH of the jobs listed below" in prompt:
+        jobs = re.findall(r"^\s*\d+\. Job: (.+)\n.*\n\s*Required Skills: (.*)$", prompt, re.MULTILINE)
+        return json.dumps([{"title": title.strip(), **_capability(prompt, title, skills)} for title, skills in jobs])
+
+    if "capability for the specific job" in prompt:
+        title = re.search(r"^\s*Job: (.+)$", prompt, re.MULTILINE)
+        skills = re.search(r"^\s*Required Skills: (.*)$", prompt, re.MULTILINE)
+        return json.dumps(_capability(prompt, title.group(1) if title else "", skills.group(1) if skills else ""))
+
+    if "extract ALL skills" in prompt:
+        cv = prompt.split("CV Content:", 1)[-1].split("Extract every skill", 1)[0]
+        words = re.findall(r"[A-Z][A-Za-z+#.]+", cv)
+        skills = list(dict.fromkeys(words))[:12] or ["Communication", "Teamwork"]
+        return ", ".join(skills)
+
+    if "Detect the language" in prompt:
+        return "en"
+
+    if "Translate the following" in prompt:
+        text = re.search(r'Text to translate: "(.*)"', prompt, re.DOTALL)
+        target = "rw" if "Kinyarwanda" in prompt else "xx"
+        return f"[{target}] {text.group(1) if text else ''}"
+
+    if "Clean and structure the following CV" in prompt:
+        original = prompt.split("Original text:", 1)[-1].rsplit("Cleaned text:", 1)[0]
+        return original.strip()
+
+    return CHAT_REPLIES[_seed(prompt) % len(CHAT_REPLIES)]
+
+
+def _prompt_text(body):
+    return "\n".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+def _response_body(text, prompt):
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": len(prompt) // 4,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": (len(prompt) + len(text)) // 4,
+        },
+    }
+
+
+@app.get("/")
+async def root():
+    return {"message": "Fake Gemini server is running", "settings": settings, "stats": stats}
+
+
+def _chunks(text, words_per_chunk=4):
+    words = text.split(" ")
+    return [" ".join(words[i:i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+            for i in range(0, len(words), words_per_chunk)]
+
+
+@app.post("/v1beta/models/{target}")
+async def generate_content(target: str, request: Request):
+    """Handles models/{model}:generateContent and models/{model}:streamGenerateContent"""
+    _, _, method = target.partition(":")
+    if method not in ("generateContent", "streamGenerateContent"):
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "message": f"Unknown method {method}", "status": "NOT_FOUND"}})
+
+    body = await request.json()
+    prompt = _prompt_text(body)
+    stats["requests"] += 1
+
+    latency = settings["latency_median"] * rng.lognormvariate(0, settings["latency_sigma"]) if settings["latency_median"] > 0 else 0
+
+    if rng.random() < settings["error_rate"]:
+        await asyncio.sleep(latency)
+        stats["errors"] += 1
+        code, status, message = rng.choice(ERRORS)
+        return JSONResponse(status_code=code, content={"error": {"code": code, "message": message, "status": status}})
+
+    text = canned_response(prompt)
+    if method == "generateContent":
+        await asyncio.sleep(latency)
+        return _response_body(text, prompt)
+
+    # Streaming: first chunk after a fifth of the latency, the rest spread over the remainder
+    chunks = _chunks(text)
+    sse = request.query_params.get("alt") == "sse"
+
+    async def stream():
+        await asyncio.sleep(latency * 0.2)
+        if not sse:
+            yield "["
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(latency * 0.8 / max(1, len(chunks) - 1))
+            payload = json.dumps(_response_body(chunk, prompt))
+            yield f"data: {payload}\r\n\r\n" if sse else ("," if i else "") + payload
+        if not sse:
+            yield "]"
+
+    # The SDK's REST transport reads a streamed JSON array; alt=sse gives Server-Sent Events
+    return StreamingResponse(stream(), media_type="text/event-stream" if sse else "application/json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini stand-in for offline load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-median", type=float, default=0.5, help="Median response latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal shape; 0 gives a fixed latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error sampling")
+    args = parser.parse_args()
+
+    settings.update(latency_median=args.latency_median, latency_sigma=args.latency_sigma, error_rate=args.error_rate)
+    rng.seed(args.seed)
+
+    print("🚀 Starting fake Gemini server...")
+    print(f"🌐 Point the backend at it with SMARTPATH_GEMINI_ENDPOINT=http://{args.host}:{args.port}")
+
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,477 @@
+"""
+Shared job catalog for SmartPath AI
+
+A JobCatalog holds everything the backend knows about the job postings:
+the text columns, the required skills resolved to taxonomy ids and the
+vector index, which holds the only copy of the description embeddings. Modules read
+jobs through current_catalog() instead of loading jobs_dataset.csv
+themselves, so the postings are parsed, embedded and held once per process.
+
+A catalog is never modified in place. reload_catalog(), upsert_jobs() and
+delete_jobs() build the next version copy-on-write and publish it with a
+single assignment: a request that took a catalog keeps a consistent view
+while an update lands, and the next call to current_catalog() in any
+module sees the new version.
+
+Postings changed through the API are kept in a SQLite store
+(JOBS_STORE_PATH) that is applied on top of the dataset at load. Workers
+poll it every JOBS_SYNC_INTERVAL seconds, so an upsert, delete or reload
+handled by one worker reaches all of them.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    JOBS_DATASET_PATH, JOBS_STORE_PATH, JOBS_SYNC_INTERVAL,
+    JOB_INDEX_TYPE, JOB_INDEX_IVF_MIN_SIZE, JOB_INDEX_NLIST, JOB_INDEX_NPROBE, JOB_INDEX_PROBE_FRACTION,
+    JOB_INDEX_MIN_RECALL, JOB_INDEX_PATH
+)
+from embedding_cache import text_hash
+import embedding_model
+from embedding_model import encode_texts
+from keyword_matcher import normalize
+from skill_taxonomy import get_taxonomy
+from vector_index import JobIndex, create_index, recall_at_k
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobRecord(NamedTuple):
+    """One job with its required skills parsed"""
+    slot: int
+    id: str
+    title: str
+    description: str
+    skills: str  # As stored, ";"-separated
+    required_skills: dict  # Taxonomy key -> skill name, see SkillTaxonomy.skill_keys
+
+
+def job_content_hash(job):
+    """Hash of the fields that affect matching, used to skip unchanged postings"""
+    return text_hash("\x1f".join(str(job.get(field, "")) for field in ("title", "description", "skills")))
+
+
+def build_job_index(embeddings, texts):
+    """
+    Build the vector index over the job corpus, reusing the saved IVF index
+    when it was built from the same model and job texts
+    """
+    kind = JOB_INDEX_TYPE
+    if kind == "auto":
+        kind = "ivf" if len(embeddings) >= JOB_INDEX_IVF_MIN_SIZE else "exact"
+
+    fingerprint = text_hash(embedding_model.model_key() + "\n" + "\n".join(text_hash(t) for t in texts))
+
+    if kind == "ivf" and JOB_INDEX_PATH and os.path.exists(JOB_INDEX_PATH):
+        try:
+            index = JobIndex.load(JOB_INDEX_PATH)
+            if index.kind == kind and index.fingerprint == fingerprint:
+                logger.info(f"Loaded job index from {JOB_INDEX_PATH}")
+                return index
+        except Exception as e:
+            logger.warning(f"Could not load saved job index: {e}")
+
+    params = {"nlist": JOB_INDEX_NLIST, "nprobe": JOB_INDEX_NPROBE, "probe_fraction": JOB_INDEX_PROBE_FRACTION}
+    index = create_index(kind, **(params if kind == "ivf" else {})).build(embeddings)
+    index.fingerprint = fingerprint
+
+    if kind == "ivf":
+        # Sampled job vectors as queries: a cheap check that nprobe suits this corpus
+        sample = embeddings[np.random.default_rng(0).choice(len(embeddings), min(64, len(embeddings)), replace=False)]
+        recall = recall_at_k(index, sample, k=10)
+        logger.info(f"IVF recall@10 on a job sample: {recall:.3f} ({index.probe_count()}/{index.nlist} cells scanned)")
+        if recall < JOB_INDEX_MIN_RECALL:
+            logger.warning("IVF recall is low for this corpus: raise JOB_INDEX_NPROBE/JOB_INDEX_PROBE_FRACTION or use JOB_INDEX_TYPE = 'exact'")
+
+    if kind == "ivf" and JOB_INDEX_PATH:
+        try:
+            os.makedirs(os.path.dirname(JOB_INDEX_PATH), exist_ok=True)
+            index.save(JOB_INDEX_PATH)
+        except OSError as e:
+            logger.warning(f"Could not save job index: {e}")
+
+    return index
+
+
+def _columns(jobs, slots):
+    """
+    Columnar form of a list of job dicts (id, title, description, skills,
+    content_hash) stored at the given slots
+
+    Required skills are resolved against the taxonomy once here: known
+    skills become int32 ids in CSR form, the few names outside the
+    taxonomy are kept per slot.
+    """
+    taxonomy = get_taxonomy()
+    skill_ids, lengths, extra_skills = [], [], {}
+    for slot, job in zip(slots.tolist(), jobs):
+        keys = taxonomy.skill_keys(job["skills"].split(";"))
+        known = [key for key in keys if isinstance(key, int)]
+        skill_ids.extend(known)
+        lengths.append(len(known))
+        extra = tuple(name for key, name in keys.items() if not isinstance(key, int))
+        if extra:
+            extra_skills[slot] = extra
+
+    def text_column(field):
+        column = np.empty(len(jobs), dtype=object)
+        column[:] = [job[field] for job in jobs]
+        return column
+
+    return {
+        "slots": np.asarray(slots, dtype=np.int64),
+        "ids": text_column("id"),
+        "titles": text_column("title"),
+        "descriptions": text_column("description"),
+        "skills": text_column("skills"),
+        "content_hashes": text_column("content_hash"),
+        "skill_ids": np.asarray(skill_ids, dtype=np.int32),
+        "skill_offsets": np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+        "extra_skills": extra_skills,
+    }
+
+
+class JobCatalog:
+    """
+    One immutable version of the job postings
+
+    Rows are ordered by slot, the stable integer id of a posting in the
+    vector index. Text columns are row-aligned numpy object arrays. The
+    required skills of row r are skill_ids[skill_offsets[r]:skill_offsets[r + 1]]
+    (taxonomy ids), plus extra_skills[slot] for names the taxonomy does not
+    know. The embeddings are held only by the index (see vectors()).
+    """
+
+    def __init__(self, version, next_slot, slots, ids, titles, descriptions, skills, content_hashes,
+                 skill_ids, skill_offsets, extra_skills, index):
+        self.version = version
+        self.next_slot = next_slot
+        self.slots = slots
+        self.ids = ids
+        self.titles = titles
+        self.descriptions = descriptions
+        self.skills = skills
+        self.content_hashes = content_hashes
+        self.skill_ids = skill_ids
+        self.skill_offsets = skill_offsets
+        self.extra_skills = extra_skills
+        self.index = index
+
+        self.row_of_id = {job_id: row for row, job_id in enumerate(ids)}
+        self.row_of_title = {}  # Case-folded title -> first row with that title
+        for row, title in enumerate(titles):
+            self.row_of_title.setdefault(title.casefold(), row)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def rows(self, slots):
+        """Row positions of slots returned by the vector index"""
+        return np.searchsorted(self.slots, slots)
+
+    def vectors(self, slots):
+        """Embeddings of the given slots"""
+        return self.index.get_vectors(slots)
+
+    def required_skills(self, row):
+        """Taxonomy key -> skill name for the skills a job requires"""
+        names = get_taxonomy().names
+        start, end = self.skill_offsets[row], self.skill_offsets[row + 1]
+        required = {skill_id: names[skill_id] for skill_id in self.skill_ids[start:end].tolist()}
+        for name in self.extra_skills.get(int(self.slots[row]), ()):
+            required.setdefault(normalize(name), name)
+        return required
+
+    def record(self, row):
+        """JobRecord for a row"""
+        return JobRecord(
+            int(self.slots[row]), self.ids[row], self.titles[row], self.descriptions[row],
+            self.skills[row], self.required_skills(row)
+        )
+
+    def find(self, title):
+        """JobRecord for a job title (case-insensitive), or None"""
+        row = self.row_of_title.get(title.casefold())
+        return None if row is None else self.record(row)
+
+    @classmethod
+    def load(cls, path=JOBS_DATASET_PATH, version=1):
+        """Read a jobs CSV (title, description, skills and optional id) and embed it"""
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        if "id" not in df.columns:
+            df.insert(0, "id", df["title"])  # Dataset jobs are keyed by title
+        jobs = df[["id", "title", "description", "skills"]].to_dict("records")
+        for job in jobs:
+            job["content_hash"] = job_content_hash(job)
+
+        columns = _columns(jobs, np.arange(len(jobs)))
+        descriptions = columns["descriptions"].tolist()
+        index = build_job_index(encode_texts(descriptions), descriptions)
+        return cls(version, len(jobs), index=index, **columns)
+
+    def updated(self, stale_slots, jobs, embeddings):
+        """
+        Next version with the stale slots removed and the new jobs appended
+        at fresh slots (new rows only are parsed and embedded by the caller)
+        """
+        keep = ~np.isin(self.slots, np.asarray(stale_slots, dtype=np.int64))
+        new = _columns(jobs, np.arange(self.next_slot, self.next_slot + len(jobs)))
+
+        # Skills of kept rows are carried over as CSR segments, not re-parsed
+        lengths = np.diff(self.skill_offsets)
+        skill_ids = np.concatenate((self.skill_ids[np.repeat(keep, lengths)], new["skill_ids"]))
+        lengths = np.concatenate((lengths[keep], np.diff(new["skill_offsets"])))
+        stale = set(np.asarray(stale_slots).tolist())
+        extra_skills = {slot: names for slot, names in self.extra_skills.items() if slot not in stale}
+        extra_skills.update(new["extra_skills"])
+
+        slots = np.concatenate((self.slots[keep], new["slots"]))
+
+        # The index owns the vectors: one copy-on-write update, no second matrix
+        index = self.index.copy().update(stale_slots, embeddings, new["slots"])
+        index.fingerprint = None
+
+        columns = {
+            name: np.concatenate((getattr(self, name)[keep], new[name]))
+            for name in ("ids", "titles", "descriptions", "skills", "content_hashes")
+        }
+        return JobCatalog(
+            self.version + 1, self.next_slot + len(jobs), slots, skill_ids=skill_ids,
+            skill_offsets=np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+            extra_skills=extra_skills, index=index, **columns
+        )
+
+
+def _store():
+    """
+    Connection to the store of postings changed through the API
+
+    job_changes holds the latest upsert or delete (tombstone) per job id,
+    numbered by a global sequence; meta holds the dataset generation that
+    reload_catalog() bumps. Every worker reads the same file.
+    """
+    os.makedirs(os.path.dirname(JOBS_STORE_PATH), exist_ok=True)
+    db = sqlite3.connect(JOBS_STORE_PATH, timeout=10)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS job_changes ("
+        "id TEXT PRIMARY KEY, seq INTEGER, deleted INTEGER, title TEXT, description TEXT, skills TEXT)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS job_changes_seq ON job_changes (seq)")
+    db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+    return db
+
+
+def _record_changes(jobs=(), deleted_ids=()):
+    """Persist upserted jobs and deleted ids under the next sequence number"""
+    with closing(_store()) as db, db:
+        db.execute("BEGIN IMMEDIATE")
+        seq = db.execute("SELECT COALESCE(MAX(seq), 0) FROM job_changes").fetchone()[0] + 1
+        db.executemany(
+            "INSERT OR REPLACE INTO job_changes VALUES (?, ?, 0, ?, ?, ?)",
+            [(job["id"], seq, job["title"], job["description"], job["skills"]) for job in jobs],
+        )
+        db.executemany(
+            "INSERT OR REPLACE INTO job_changes VALUES (?, ?, 1, NULL, NULL, NULL)",
+            [(job_id, seq) for job_id in deleted_ids],
+        )
+
+
+def _store_state(since):
+    """Dataset generation and the changes stored after sequence number since"""
+    with closing(_store()) as db:
+        row = db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        changes = db.execute(
+            "SELECT id, seq, deleted, title, description, skills FROM job_changes WHERE seq > ? ORDER BY seq",
+            (since,),
+        ).fetchall()
+    return (row[0] if row else 0), changes
+
+
+def _stored_hash(catalog, job_id):
+    row = catalog.row_of_id.get(job_id)
+    return None if row is None else catalog.content_hashes[row]
+
+
+# The catalog is loaded once, on first use; updates swap in a new version.
+# _synced_seq and _generation track what of the shared store it reflects.
+_catalog = None
+_catalog_lock = threading.Lock()
+_synced_seq = 0
+_generation = 0
+_last_sync = 0.0
+
+
+def _load(version=1):
+    """Dataset plus every stored change, as a fresh catalog"""
+    global _synced_seq, _generation
+    catalog = JobCatalog.load(JOBS_DATASET_PATH, version)
+    _synced_seq = 0
+    _generation = None
+    return _sync(catalog)
+
+
+def _sync(catalog):
+    """
+    Catalog with the changes other workers (or this one) stored since the
+    last sync applied; only postings whose content changed are embedded.
+    A reload_catalog() in any worker makes every worker reload.
+    (Caller holds _catalog_lock.)
+    """
+    global _synced_seq, _generation, _last_sync
+    _last_sync = time.monotonic()
+    try:
+        generation, changes = _store_state(_synced_seq)
+    except sqlite3.Error as e:
+        logger.warning(f"Job store unavailable, serving catalog version {catalog.version}: {e}")
+        return catalog
+
+    if _generation is None:
+        _generation = generation
+    elif generation != _generation:
+        logger.info("Jobs dataset reloaded by another worker, reloading")
+        return _load(catalog.version + 1)
+    if not changes:
+        return catalog
+
+    latest = {}
+    for job_id, seq, deleted, title, description, skills in changes:
+        latest[job_id] = None if deleted else {"id": job_id, "title": title, "description": description, "skills": skills}
+    _synced_seq = changes[-1][1]
+
+    changed = []
+    for job in latest.values():
+        if job is not None:
+            job["content_hash"] = job_content_hash(job)
+            if _stored_hash(catalog, job["id"]) != job["content_hash"]:
+                changed.append(job)
+    stale_ids = [job["id"] for job in changed] + [job_id for job_id, job in latest.items() if job is None]
+    stale_slots = [int(catalog.slots[catalog.row_of_id[job_id]]) for job_id in stale_ids if job_id in catalog.row_of_id]
+    if not changed and not stale_slots:
+        return catalog
+
+    embeddings = encode_texts([job["description"] for job in changed]) if changed else None
+    catalog = catalog.updated(stale_slots, changed, embeddings)
+    logger.info(f"Job catalog version {catalog.version}: {len(changed)} postings embedded, {len(stale_slots)} replaced or removed")
+    return catalog
+
+
+def current_catalog():
+    """
+    Return the current job catalog (safe to use without locking)
+
+    At most every JOBS_SYNC_INTERVAL seconds, changes stored by other
+    workers are applied first; a request never waits for another one's sync.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = _load()
+    elif time.monotonic() - _last_sync >= JOBS_SYNC_INTERVAL and _catalog_lock.acquire(blocking=False):
+        try:
+            _catalog = _sync(_catalog)
+        finally:
+            _catalog_lock.release()
+    return _catalog
+
+
+def reload_catalog():
+    """
+    Re-read the jobs dataset and publish it as the next catalog version
+
+    Postings changed through upsert_jobs()/delete_jobs() are stored apart
+    from the dataset and applied again on top of it. Other workers reload
+    on their next sync.
+    """
+    global _catalog
+    with _catalog_lock:
+        with closing(_store()) as db, db:
+            db.execute(
+                "INSERT INTO meta VALUES ('generation', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+        _catalog = _load(_catalog.version + 1 if _catalog is not None else 1)
+        logger.info(f"Job catalog reloaded: {len(_catalog)} jobs, version {_catalog.version}")
+        return {"jobs": len(_catalog), "version": _catalog.version}
+
+
+def upsert_jobs(postings):
+    """
+    Add or update job postings without rebuilding the index
+
+    Only postings that are new or whose title/description/skills changed
+    (by content hash) are stored and embedded. Stored postings survive
+    restarts and reloads and reach every worker within JOBS_SYNC_INTERVAL.
+
+    Args:
+        postings: Iterable of dicts with id, title, description and skills
+
+    Returns:
+        Dict with added/updated/unchanged counts and the new catalog version
+    """
+    global _catalog
+    current_catalog()
+    with _catalog_lock:
+        _catalog = _sync(_catalog)
+        catalog = _catalog
+
+        # Last posting wins when an id repeats
+        incoming = {}
+        for posting in postings:
+            job = {
+                "id": str(posting["id"]),
+                "title": posting["title"],
+                "description": posting["description"],
+                "skills": posting.get("skills") or "",
+            }
+            job["content_hash"] = job_content_hash(job)
+            incoming[job["id"]] = job
+
+        changed = [job for job in incoming.values() if _stored_hash(catalog, job["id"]) != job["content_hash"]]
+        updated = sum(1 for job in changed if job["id"] in catalog.row_of_id)
+        result = {
+            "added": len(changed) - updated,
+            "updated": updated,
+            "unchanged": len(incoming) - len(changed),
+            "version": catalog.version,
+        }
+        if not changed:
+            return result
+
+        _record_changes(jobs=changed)
+        _catalog = _sync(catalog)
+        result["version"] = _catalog.version
+        logger.info(f"Job catalog updated: {result}")
+        return result
+
+
+def delete_jobs(job_ids):
+    """
+    Remove job postings from the catalog (for every worker, until upserted again)
+
+    Returns:
+        Dict with the number of deleted postings and the new catalog version
+    """
+    global _catalog
+    current_catalog()
+    with _catalog_lock:
+        _catalog = _sync(_catalog)
+        wanted = [job_id for job_id in dict.fromkeys(map(str, job_ids)) if job_id in _catalog.row_of_id]
+        if not wanted:
+            return {"deleted": 0, "version": _catalog.version}
+
+        _record_changes(deleted_ids=wanted)
+        _catalog = _sync(_catalog)
+        logger.info(f"Removed {len(wanted)} jobs from the catalog")
+        return {"deleted": len(wanted), "version": _catalog.version}
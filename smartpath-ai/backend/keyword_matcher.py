@@ -0,0 +1,104 @@
+"""
+Multi-keyword matcher for SmartPath AI (Aho-Corasick)
+
+The automaton is built once from a vocabulary and finds every keyword in a
+single pass over the text, so matching cost is linear in the text length
+whatever the vocabulary size. Matching is case-insensitive (casefold) and
+treats any run of whitespace as one space. A match only counts when it is
+not glued to letters or digits on either side, which also works for
+keywords that start or end in symbols ("C++", "C#", "Node.js") where the
+regex \\b boundary does not.
+"""
+import re
+from collections import deque
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Casefold and collapse whitespace; keywords and texts are compared in this form"""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over a fixed list of keywords"""
+
+    def __init__(self, keywords):
+        self.keywords = []
+        self._lengths = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        seen = set()
+        for keyword in keywords:
+            pattern = normalize(keyword)
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            self._insert(pattern, len(self.keywords))
+            self.keywords.append(keyword)
+            self._lengths.append(len(pattern))
+        self._link()
+
+    def _insert(self, pattern, keyword_id):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(keyword_id)
+
+    def _link(self):
+        """Breadth-first construction of failure links and merged outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def finditer(self, text):
+        """
+        Yield (start, end, keyword id) for every bounded keyword occurrence
+
+        Positions refer to normalize(text), not to the original text.
+        """
+        text = normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for keyword_id in out[node]:
+                start = i + 1 - self._lengths[keyword_id]
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if i + 1 < len(text) and _is_word_char(text[i + 1]):
+                    continue
+                yield start, i + 1, keyword_id
+
+    def find_ids(self, text):
+        """Ids (positions in self.keywords) of the keywords found in text"""
+        return {keyword_id for _, _, keyword_id in self.finditer(text)}
+
+    def find(self, text):
+        """Set of keywords (as given to the constructor) found in text"""
+        return {self.keywords[keyword_id] for keyword_id in self.find_ids(text)}
+
+    def __len__(self):
+        return len(self.keywords)
@@ -0,0 +1,161 @@
+"""
+Content-addressed cache for Gemini responses
+
+Responses are keyed by model name and a hash of the whitespace-normalized
+prompt. Lookups go to an in-memory LRU first, then to a SQLite store shared
+by all workers. Each call type has its own TTL (LLM_CACHE_TTLS in config.py).
+Expired entries are purged when the cache opens and every
+LLM_CACHE_PURGE_EVERY writes, and the store is capped at LLM_CACHE_MAX_ROWS
+(oldest entries go first), so it does not keep CV text forever.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTLS, LLM_CACHE_DEFAULT_TTL,
+    LLM_CACHE_MAX_ROWS, LLM_CACHE_PURGE_EVERY
+)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def prompt_key(model_name, prompt):
+    """Cache key for a prompt: model name plus hash of the normalized prompt"""
+    normalized = re.sub(r"\s+", " ", prompt).strip()
+    digest = hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+    return digest
+
+
+class LLMCache:
+    """Two-level (memory LRU + SQLite) response cache with hit/miss counters"""
+
+    def __init__(self, db_path: str, max_memory_entries: int = 1024, max_rows: int = 0, purge_every: int = 256):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_rows = max_rows
+        self.purge_every = purge_every
+        self._puts = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, call_type TEXT, response TEXT, created_at REAL, expires_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)")
+        self._db.commit()
+        self.purge_expired()
+
+    def get(self, key, call_type="default"):
+        """Return the cached response text, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self._stats[call_type]["memory_hits"] += 1
+                return entry[0]
+
+            try:
+                row = self._db.execute(
+                    "SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache read failed: {e}")
+                row = None
+            if row:
+                self._remember(key, row[0], row[1])
+                self._stats[call_type]["disk_hits"] += 1
+                return row[0]
+
+            self._stats[call_type]["misses"] += 1
+            return None
+
+    def put(self, key, response, call_type="default", ttl=None):
+        """Store a response for ttl seconds (call type default when None)"""
+        ttl = ttl if ttl is not None else LLM_CACHE_TTLS.get(call_type, LLM_CACHE_DEFAULT_TTL)
+        if ttl <= 0 or not response:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now + ttl)
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                    (key, call_type, response, now, now + ttl),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {e}")
+            self._puts += 1
+            purge = self.purge_every and self._puts % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def _remember(self, key, response, expires_at):
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self):
+        """Delete expired entries, then the oldest ones above max_rows, from the SQLite store"""
+        with self._lock:
+            try:
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                if self.max_rows:
+                    excess = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_rows
+                    if excess > 0:
+                        self._db.execute(
+                            "DELETE FROM llm_cache WHERE key IN "
+                            "(SELECT key FROM llm_cache ORDER BY created_at LIMIT ?)",
+                            (excess,),
+                        )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache purge failed: {e}")
+
+    def stats(self):
+        """Hit/miss counters per call type"""
+        with self._lock:
+            return {call_type: dict(counts) for call_type, counts in self._stats.items()}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache, or None when caching is disabled or unavailable"""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = LLMCache(
+                        LLM_CACHE_PATH, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_MAX_ROWS, LLM_CACHE_PURGE_EVERY
+                    )
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM cache unavailable: {e}")
+                    return None
+    return _cache
+
+
+def cache_stats():
+    """Counters for the process-wide cache"""
+    cache = get_cache()
+    return cache.stats() if cache else {}
@@ -0,0 +1,513 @@
+"""
+Single gateway for all Gemini calls in SmartPath AI
+
+The SDK is configured once per process and one GenerativeModel client is
+kept per model name, so call sites no longer pay for configure/instantiate
+on every request and share the same connection, timeout, response cache
+and metrics. Identical prompts that are in flight at the same time are
+coalesced into one upstream call (single-flight).
+
+Every call is bounded by LLM_TIMEOUT and by the deadline of the enclosing
+request (see llm_deadline). A per-model circuit breaker opens after
+consecutive upstream failures (timeouts, transport errors, 429 and 5xx) so
+callers fail fast into their local fallbacks until the upstream recovers.
+A reply the model did answer, but without text (e.g. a safety block), is
+raised as EmptyResponseError and does not count against the breaker.
+
+Upstream calls also pass a client-side rate limiter (requests and tokens
+per minute, shared by all workers on the host) that serves interactive calls
+before background work, so under quota pressure chat stays responsive and
+bulk analysis queues instead.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from config import (
+    GOOGLE_API_KEY, GEMINI_MODEL, GEMINI_API_ENDPOINT, LLM_TIMEOUT, MAX_TOKENS,
+    LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_TIMEOUT,
+    LLM_RATE_LIMIT_ENABLED, LLM_RATE_LIMIT_RPM, LLM_RATE_LIMIT_TPM, LLM_RATE_LIMIT_MAX_WAIT,
+    LLM_RATE_LIMIT_STATE_PATH, LLM_CALL_PRIORITIES
+)
+from llm_cache import get_cache, prompt_key
+from rate_limiter import RateLimiter
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_clients_lock = threading.Lock()
+_configured = False
+
+
+def _reset_clients():
+    """Drop clients inherited through fork(): gRPC channels are not fork-safe"""
+    global _clients_lock, _configured
+    _clients.clear()
+    _clients_lock = threading.Lock()
+    _configured = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients)
+
+_metrics_lock = threading.Lock()
+_metrics = defaultdict(lambda: {
+    "calls": 0, "errors": 0, "cache_hits": 0, "coalesced": 0, "rate_limited": 0, "parse_failures": 0,
+    "total_latency": 0.0, "total_queued": 0.0, "max_queued": 0.0,
+})
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# Absolute time.monotonic() deadline for LLM calls made in the current request
+_deadline = contextvars.ContextVar("llm_deadline", default=None)
+# Rate limiter priority for LLM calls made in the current request (see llm_priority)
+_priority = contextvars.ContextVar("llm_priority", default=None)
+
+_limiter = (
+    RateLimiter(LLM_RATE_LIMIT_RPM, LLM_RATE_LIMIT_TPM, LLM_RATE_LIMIT_STATE_PATH or None)
+    if LLM_RATE_LIMIT_ENABLED else None
+)
+
+
+class LLMUnavailableError(Exception):
+    """The upstream was not called; callers should use their local fallback"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised while the circuit breaker for a model is open"""
+
+
+class DeadlineExceededError(LLMUnavailableError, TimeoutError):
+    """Raised when the request's LLM budget is already spent"""
+
+
+class RateLimitedError(LLMUnavailableError):
+    """Raised when a call could not get rate limiter capacity in time"""
+
+
+class EmptyResponseError(Exception):
+    """The model answered without text (blocked or empty candidate); retrying the same prompt will not help"""
+
+
+@contextlib.contextmanager
+def llm_deadline(seconds):
+    """
+    Bound all LLM calls made inside the block (including worker threads
+    started from it with asyncio.to_thread) to a total budget of seconds
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextlib.contextmanager
+def llm_priority(priority):
+    """
+    Queue all LLM calls made inside the block at the given rate limiter
+    priority ("interactive", "normal" or "background") unless a call
+    passes its own
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(prompt):
+    """Rough token cost of a call: ~4 characters per prompt token plus the output budget"""
+    return len(prompt) // 4 + MAX_TOKENS
+
+
+def _acquire_rate_limit(prompt, call_type, priority):
+    """
+    Wait for rate limiter capacity, bounded by the request deadline
+
+    Raises:
+        RateLimitedError: No capacity before the deadline / LLM_RATE_LIMIT_MAX_WAIT
+    """
+    if _limiter is None:
+        return
+    priority = priority or _priority.get() or LLM_CALL_PRIORITIES.get(call_type, "normal")
+    deadline = _deadline.get()
+    wait = LLM_RATE_LIMIT_MAX_WAIT
+    if deadline is not None:
+        wait = min(wait, max(0.0, deadline - time.monotonic()))
+
+    queued = _limiter.acquire(estimate_tokens(prompt), priority, timeout=wait)
+    if queued is None:
+        _record(call_type, queued=wait, rate_limited=True)
+        raise RateLimitedError(f"Gemini rate limit: no capacity for {call_type} call within {wait:.1f}s")
+    _record(call_type, queued=queued)
+
+
+def _call_timeout():
+    """Timeout for the next upstream call: LLM_TIMEOUT capped by the request deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return LLM_TIMEOUT
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError("LLM request budget exhausted")
+    return min(LLM_TIMEOUT, remaining)
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass. After failure_threshold consecutive failures it opens
+    and rejects calls for reset_timeout seconds, then lets one trial call
+    through (half-open); success closes it, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+        raise CircuitOpenError("Gemini circuit breaker is open")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logger.warning(f"Gemini circuit breaker opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """Give back a half-open trial slot that was not used for a call"""
+        with self._lock:
+            self.trial_in_flight = False
+
+
+_breakers = defaultdict(lambda: CircuitBreaker(LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_TIMEOUT))
+
+
+def _is_upstream_failure(error):
+    """
+    Whether an error says the upstream is unhealthy (transport error, timeout,
+    429 or 5xx) rather than that this one request was rejected
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (api_exceptions.ServerError, api_exceptions.TooManyRequests, api_exceptions.RetryError))
+
+
+def _record_call_error(breaker, error):
+    """Count an upstream failure against the breaker; other errors only free a half-open trial slot"""
+    if _is_upstream_failure(error):
+        breaker.record_failure()
+    else:
+        breaker.release_trial()
+
+
+def _response_text(response, allow_empty=False):
+    """
+    Text of a response or stream chunk
+
+    Raises:
+        EmptyResponseError: The candidate was blocked or has no text
+    """
+    try:
+        text = response.text
+    except ValueError as e:
+        # The SDK raises ValueError for a candidate without parts, e.g. after a safety block
+        raise EmptyResponseError(f"Gemini returned no text: {e}") from e
+    if not text and not allow_empty:
+        raise EmptyResponseError("Gemini returned an empty response")
+    return text
+
+
+class _Flight:
+    """One in-progress upstream call that concurrent identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _single_flight(key, call_type, func):
+    """
+    Run func once per key at a time; concurrent callers with the same key
+    wait for the leader and receive its result (or its exception)
+    """
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+
+    if not leader:
+        _record(call_type, coalesced=True)
+        deadline = _deadline.get()
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not flight.done.wait(timeout):
+            raise DeadlineExceededError("LLM request budget exhausted while waiting for a shared call")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = func()
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+
+def get_client(model_name=GEMINI_MODEL):
+    """
+    Return the shared GenerativeModel for a model name
+
+    Raises:
+        ImportError: google-generativeai is not installed
+    """
+    global _configured
+    client = _clients.get(model_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(model_name)
+            if client is None:
+                import google.generativeai as genai
+
+                if not _configured:
+                    if GEMINI_API_ENDPOINT:
+                        logger.info(f"Using Gemini API endpoint {GEMINI_API_ENDPOINT}")
+                        genai.configure(
+                            api_key=GOOGLE_API_KEY, transport="rest",
+                            client_options={"api_endpoint": GEMINI_API_ENDPOINT}
+                        )
+                    else:
+                        genai.configure(api_key=GOOGLE_API_KEY)
+                    _configured = True
+                client = genai.GenerativeModel(model_name)
+                _clients[model_name] = client
+    return client
+
+
+def _record(call_type, latency=None, error=False, cache_hit=False, coalesced=False, queued=None, rate_limited=False):
+    with _metrics_lock:
+        entry = _metrics[call_type]
+        if queued is not None:
+            entry["total_queued"] += queued
+            entry["max_queued"] = max(entry["max_queued"], queued)
+            entry["rate_limited"] += int(rate_limited)
+            return
+        if cache_hit or coalesced:
+            entry["cache_hits" if cache_hit else "coalesced"] += 1
+            return
+        entry["calls"] += 1
+        entry["total_latency"] += latency or 0.0
+        if error:
+            entry["errors"] += 1
+
+
+def record_parse_failure(call_type):
+    """Count a response that did not match the structure the caller expected"""
+    with _metrics_lock:
+        _metrics[call_type]["parse_failures"] += 1
+
+
+def _cache_key(model_name, prompt, json_output=False):
+    # Responses from an alternative endpoint (e.g. the fake server) are cached apart from real ones
+    namespace = f"{GEMINI_API_ENDPOINT}/{model_name}" if GEMINI_API_ENDPOINT else model_name
+    return prompt_key(f"{namespace}/json" if json_output else namespace, prompt)
+
+
+def _admit(prompt, call_type, model_name, priority):
+    """
+    Pass the circuit breaker and rate limiter before an upstream call
+
+    Returns:
+        Tuple of (breaker, timeout in seconds for the call)
+    """
+    _call_timeout()  # Fail fast when the request budget is already spent
+    breaker = _breakers[model_name]
+    breaker.before_call()
+    try:
+        _acquire_rate_limit(prompt, call_type, priority)
+        return breaker, _call_timeout()
+    except LLMUnavailableError:
+        breaker.release_trial()
+        raise
+
+
+def generate(prompt, call_type="default", model_name=GEMINI_MODEL, use_cache=True, priority=None,
+             json_output=False):
+    """
+    Generate text for a prompt
+
+    Args:
+        prompt: Prompt text
+        call_type: Call category used for cache TTLs and metrics
+        model_name: Gemini model to use
+        use_cache: Serve from / store in the response cache
+        priority: Rate limiter priority; defaults to llm_priority() or LLM_CALL_PRIORITIES
+        json_output: Ask the model for a JSON response (parse it with structured_output)
+
+    Returns:
+        Response text
+
+    Raises:
+        ImportError: google-generativeai is not installed
+        LLMUnavailableError: Circuit open, rate limited or request deadline exceeded
+        EmptyResponseError: The model answered without text (e.g. safety block)
+        Exception: Any upstream error from the Gemini API
+    """
+    cache = get_cache() if use_cache else None
+    key = _cache_key(model_name, prompt, json_output)
+    if cache:
+        text = cache.get(key, call_type)
+        if text is not None:
+            _record(call_type, cache_hit=True)
+            return text
+
+    def call_upstream():
+        client = get_client(model_name)
+        breaker, timeout = _admit(prompt, call_type, model_name, priority)
+        start = time.perf_counter()
+        try:
+            generation_config = {"response_mime_type": "application/json"} if json_output else None
+            response = client.generate_content(
+                prompt, generation_config=generation_config, request_options={"timeout": timeout}
+            )
+        except Exception as e:
+            _record_call_error(breaker, e)
+            _record(call_type, time.perf_counter() - start, error=True)
+            raise
+        breaker.record_success()
+        _record(call_type, time.perf_counter() - start)
+        text = _response_text(response)
+
+        if cache:
+            cache.put(key, text, call_type)
+        return text
+
+    return _single_flight(key, call_type, call_upstream)
+
+
+def generate_stream(prompt, call_type="default", model_name=GEMINI_MODEL, use_cache=True, priority=None):
+    """
+    Generate text for a prompt, yielding chunks as the model produces them
+
+    Same cache, circuit breaker, rate limiter and deadline handling as
+    generate(); a cached response is yielded as a single chunk. The full
+    text is cached once the stream completes. Streams are not coalesced.
+
+    Raises:
+        ImportError: google-generativeai is not installed
+        LLMUnavailableError: Circuit open, rate limited or request deadline exceeded
+        EmptyResponseError: The model answered without text (e.g. safety block)
+        Exception: Any upstream error from the Gemini API
+    """
+    cache = get_cache() if use_cache else None
+    key = _cache_key(model_name, prompt)
+    if cache:
+        text = cache.get(key, call_type)
+        if text is not None:
+            _record(call_type, cache_hit=True)
+            yield text
+            return
+
+    client = get_client(model_name)
+    breaker, timeout = _admit(prompt, call_type, model_name, priority)
+    start = time.perf_counter()
+    chunks = []
+    try:
+        for chunk in client.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+            text = _response_text(chunk, allow_empty=True)
+            if text:
+                chunks.append(text)
+                yield text
+        if not chunks:
+            raise EmptyResponseError("Gemini returned an empty response")
+    except GeneratorExit:
+        # Consumer went away (client disconnected); not an upstream failure
+        breaker.release_trial()
+        raise
+    except EmptyResponseError:
+        # The upstream answered, so the call was healthy even though it carries no text
+        breaker.record_success()
+        _record(call_type, time.perf_counter() - start)
+        raise
+    except Exception as e:
+        _record_call_error(breaker, e)
+        _record(call_type, time.perf_counter() - start, error=True)
+        raise
+    breaker.record_success()
+    _record(call_type, time.perf_counter() - start)
+
+    if cache:
+        cache.put(key, "".join(chunks), call_type)
+
+
+async def generate_async(prompt, call_type="default", model_name=GEMINI_MODEL, use_cache=True, priority=None,
+                         json_output=False):
+    """Async variant of generate(); the blocking call runs in a worker thread"""
+    return await asyncio.to_thread(generate, prompt, call_type, model_name, use_cache, priority, json_output)
+
+
+def get_metrics():
+    """
+    Per call type counters (upstream calls, errors, cache hits, coalesced
+    calls, rate limited calls, structured output parse failures, mean
+    latency, mean/max time queued in the rate limiter) plus the circuit
+    breaker state per model and the limiter state
+    """
+    with _metrics_lock:
+        metrics = {}
+        for call_type, entry in _metrics.items():
+            metrics[call_type] = dict(entry)
+            metrics[call_type]["avg_latency"] = round(entry["total_latency"] / entry["calls"], 3) if entry["calls"] else 0.0
+            attempts = entry["calls"] + entry["rate_limited"]
+            metrics[call_type]["avg_queued"] = round(entry["total_queued"] / attempts, 3) if attempts else 0.0
+    breakers = {name: {"state": breaker.state, "failures": breaker.failures} for name, breaker in list(_breakers.items())}
+    rate_limiter = _limiter.stats() if _limiter else None
+    return {"calls": metrics, "circuit_breakers": breakers, "rate_limiter": rate_limiter}
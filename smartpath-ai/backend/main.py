@@ -1,59 +1,67 @@
-from fastapi import FastAPI, UploadFile, HTTPException, Form
+from fastapi import FastAPI, UploadFile, HTTPException, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from match_engine import match_jobs
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Union
+from match_engine import match_jobs, match_jobs_batch, warmup as warmup_matching
+from job_catalog import upsert_jobs, delete_jobs, reload_catalog
+import embedding_model
+from llm_cache import cache_stats
+from llm_gateway import generate, generate_async, get_client, get_metrics, llm_deadline, llm_priority
 from course_recommender import recommend_courses
 from translator import translate_text, detect_language
 from skill_detector import detect_skill_gaps, extract_skills
 from text_to_speech import speak_text, is_tts_available, get_tts_info
-from chat_interface import chat_with_ai, set_chat_context, get_chat_history, clear_chat_history, get_suggested_questions
+from chat_interface import chat_with_ai, chat_with_ai_stream, set_chat_context, get_chat_history, clear_chat_history, get_suggested_questions
 import fitz  # PyMuPDF
+import asyncio
+import json
 import logging
 import os
 import sys
-from config import GOOGLE_API_KEY, GEMINI_MODEL, MAX_FILE_SIZE, SUPPORTED_FILE_TYPES
+from config import GOOGLE_API_KEY, GEMINI_MODEL, MAX_FILE_SIZE, SUPPORTED_FILE_TYPES, MATCH_TOP_K, MATCH_MAX_K, MATCH_BATCH_SIZE, PRELOAD_EMBEDDING_MODEL, PIPELINE_MAX_CONCURRENCY, LLM_REQUEST_BUDGET
 
 # Add the backend directory to Python path to ensure all modules are found
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
-# Test Google AI import at startup with detailed debugging
+# Test Google AI at startup with detailed debugging. This runs in the
+# startup hook, i.e. in each worker after gunicorn --preload has forked, so
+# no gRPC channel is created in the parent and shared by the workers.
 GOOGLE_AI_AVAILABLE = False
-print("🔍 Testing Google AI import during startup...")
 
-try:
-    print("  📦 Attempting to import google.generativeai...")
-    import google.generativeai as genai
-    print("  ✅ google.generativeai imported successfully")
+def probe_google_ai():
+    """Configure the shared Gemini client and make one test call"""
+    global GOOGLE_AI_AVAILABLE
+    print("🔍 Testing Google AI import during startup...")
 
-    print(f"  🔑 Configuring with API key: {GOOGLE_API_KEY[:10]}...")
-    genai.configure(api_key=GOOGLE_API_KEY)
-    print("  ✅ Google AI configured")
-
-    print(f"  🤖 Creating model: {GEMINI_MODEL}")
-    test_model = genai.GenerativeModel(GEMINI_MODEL)
-    print("  ✅ Model created")
+    try:
+        print(f"  🔑 Configuring shared client with API key: {GOOGLE_API_KEY[:10]}...")
+        print(f"  🤖 Creating model: {GEMINI_MODEL}")
+        get_client(GEMINI_MODEL)
+        print("  ✅ Google AI configured, model created")
 
-    print("  🧪 Testing generation...")
-    test_response = test_model.generate_content("Hello")
-    print(f"  ✅ Test response: {test_response.text[:30]}...")
+        print("  🧪 Testing generation...")
+        test_response = generate("Hello", "test", use_cache=False)
+        print(f"  ✅ Test response: {test_response[:30]}...")
 
-    print("✅ Google AI successfully imported, configured, and tested")
-    GOOGLE_AI_AVAILABLE = True
+        print("✅ Google AI successfully imported, configured, and tested")
+        GOOGLE_AI_AVAILABLE = True
 
-except ImportError as e:
-    print(f"❌ Google AI import error: {e}")
-    print("💡 Please install: pip install google-generativeai")
-    GOOGLE_AI_AVAILABLE = False
+    except ImportError as e:
+        print(f"❌ Google AI import error: {e}")
+        print("💡 Please install: pip install google-generativeai")
+        GOOGLE_AI_AVAILABLE = False
 
-except Exception as e:
-    print(f"⚠️ Google AI configuration error: {e}")
-    print(f"   Error type: {type(e).__name__}")
-    import traceback
-    traceback.print_exc()
-    GOOGLE_AI_AVAILABLE = False
+    except Exception as e:
+        print(f"⚠️ Google AI configuration error: {e}")
+        print(f"   Error type: {type(e).__name__}")
+        import traceback
+        traceback.print_exc()
+        GOOGLE_AI_AVAILABLE = False
 
-print(f"🏁 Final GOOGLE_AI_AVAILABLE status: {GOOGLE_AI_AVAILABLE}")
+    print(f"🏁 Final GOOGLE_AI_AVAILABLE status: {GOOGLE_AI_AVAILABLE}")
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -65,7 +73,41 @@ app = FastAPI(
     version="2.0.0"
 )
 
-async def extract_text_enhanced(file: UploadFile):
+# Preload weights before workers are forked; the forward pass waits for startup
+if PRELOAD_EMBEDDING_MODEL:
+    embedding_model.load_model()
+
+@app.on_event("startup")
+def check_google_ai():
+    """Probe Gemini once the worker process is running"""
+    probe_google_ai()
+
+@app.on_event("startup")
+def warmup_models():
+    """Warm up the embedding model and job index before serving requests"""
+    try:
+        warmup_matching()
+    except Exception as e:
+        logger.error(f"Model warmup failed, will load on first request: {e}")
+
+# Bounds how many blocking AI/model calls run at once across all requests
+_blocking_calls = asyncio.Semaphore(PIPELINE_MAX_CONCURRENCY)
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking call in a worker thread so independent pipeline stages can
+    overlap without stalling the event loop
+    """
+    async with _blocking_calls:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+class JobPosting(BaseModel):
+    id: Union[int, str]
+    title: str
+    description: str
+    skills: str = ""
+
+async def extract_text_enhanced(file: UploadFile, clean_with_ai: bool = True):
     """
     Enhanced text extraction with better error handling and AI-powered cleanup
     """
@@ -93,7 +135,7 @@ async def extract_text_enhanced(file: UploadFile):
             return ""
 
         # Clean and enhance the extracted text using AI
-        cleaned_text = clean_text_with_ai(text)
+        cleaned_text = await run_blocking(clean_text_with_ai, text) if clean_with_ai else text
 
         logger.info(f"Successfully extracted {len(cleaned_text)} characters from {file.filename}")
         return cleaned_text
@@ -110,11 +152,6 @@ def clean_text_with_ai(text):
         return text
 
     try:
-        import google.generativeai as genai
-
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-
         prompt = f"""
         Clean and structure the following CV/resume text. Remove any OCR errors,
         fix formatting issues, and organize the content properly while preserving all information.
@@ -126,8 +163,7 @@ def clean_text_with_ai(text):
         Cleaned text:
         """
 
-        response = model.generate_content(prompt)
-        cleaned = response.text.strip()
+        cleaned = generate(prompt, "clean_text").strip()
 
         # If AI cleaning is too short or failed, return original
         if len(cleaned) < len(text) * 0.5:
@@ -164,18 +200,14 @@ def home():
 async def test_ai():
     """Test Google AI connection at runtime"""
     try:
-        import google.generativeai as genai
-
-        # Configure and test
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-
-        response = model.generate_content("Hello! Please respond with 'AI is working correctly!'")
+        response_text = await generate_async(
+            "Hello! Please respond with 'AI is working correctly!'", "test", use_cache=False
+        )
 
         return {
             "success": True,
             "message": "Google AI is working!",
-            "ai_response": response.text.strip(),
+            "ai_response": response_text.strip(),
             "model": GEMINI_MODEL,
             "startup_flag": GOOGLE_AI_AVAILABLE
         }
@@ -197,28 +229,37 @@ async def test_ai():
         }
 
 @app.post("/match")
-async def match(file: UploadFile, lang: str = "en", user_name: str = ""):
+async def match(file: UploadFile, lang: str = "en", user_name: str = "", k: int = Query(MATCH_TOP_K, ge=1, le=MATCH_MAX_K)):
     """
     Enhanced CV matching with AI-powered analysis
     """
-    text = await extract_text_enhanced(file)
-    if not text.strip():
-        return {"matches": [], "error": "No text could be extracted from the file"}
-
-    # Detect language if not specified
-    if lang == "auto":
-        lang = detect_language(text)
-
-    jobs = match_jobs(text)
-    jobs_with_gaps = detect_skill_gaps(text, jobs)
-
-    # Extract skills for context
-    skills = list(extract_skills(text))
-
-    # If Kinyarwanda selected, translate job titles
-    if lang == "rw":
-        for job in jobs_with_gaps:
-            job["title"] = translate_text(job["title"], "rw")
+    # Every LLM call in this request shares one time budget
+    with llm_deadline(LLM_REQUEST_BUDGET):
+        text = await extract_text_enhanced(file)
+        if not text.strip():
+            return {"matches": [], "error": "No text could be extracted from the file"}
+
+        # Matching, skill extraction and language detection are independent
+        stages = [run_blocking(match_jobs, text, k=k), run_blocking(extract_skills, text)]
+        if lang == "auto":
+            stages.append(run_blocking(detect_language, text))
+        jobs, skills, *detected = await asyncio.gather(*stages)
+        skills = list(skills)
+        if detected:
+            lang = detected[0]
+
+        # Gap analysis and title translation both only need the job matches
+        gaps_stage = run_blocking(detect_skill_gaps, text, jobs, cv_skills=skills)
+        if lang == "rw":
+            titles = list(dict.fromkeys(job["title"] for job in jobs))
+            jobs_with_gaps, *translated = await asyncio.gather(
+                gaps_stage, *(run_blocking(translate_text, title, "rw") for title in titles)
+            )
+            translations = dict(zip(titles, translated))
+            for job in jobs_with_gaps:
+                job["title"] = translations.get(job["title"], job["title"])
+        else:
+            jobs_with_gaps = await gaps_stage
 
     # Set context for chat interface
     set_chat_context(
@@ -237,29 +278,71 @@ async def match(file: UploadFile, lang: str = "en", user_name: str = ""):
         "chat_context_set": True
     }
 
+@app.post("/match/batch")
+async def match_batch(files: List[UploadFile], k: int = Query(MATCH_TOP_K, ge=1, le=MATCH_MAX_K), clean_with_ai: bool = False):
+    """
+    Match many CVs at once: all CVs are encoded in one batch and scored
+    against the job matrix together, returning the top-k jobs per CV
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+
+    texts = []
+    results = []
+    # Bulk work: queue behind interactive traffic in the LLM rate limiter
+    with llm_priority("background"):
+        for file in files:
+            try:
+                text = await extract_text_enhanced(file, clean_with_ai=clean_with_ai)
+            except HTTPException as e:
+                results.append({"filename": file.filename, "matches": [], "error": e.detail})
+                continue
+            if not text.strip():
+                results.append({"filename": file.filename, "matches": [], "error": "No text could be extracted from the file"})
+                continue
+            texts.append(text)
+            results.append({"filename": file.filename, "matches": None})
+
+    # Encode in slices off the event loop, so /match and /chat keep being served
+    matches = []
+    for start in range(0, len(texts), MATCH_BATCH_SIZE):
+        matches.extend(await run_blocking(match_jobs_batch, texts[start:start + MATCH_BATCH_SIZE], k=k))
+
+    matched = iter(matches)
+    for result in results:
+        if result["matches"] is None:
+            result["matches"] = next(matched)
+            result["total_matches"] = len(result["matches"])
+
+    return {
+        "results": results,
+        "total_cvs": len(files),
+        "matched_cvs": len(texts)
+    }
+
 @app.post("/analyze")
 async def analyze_cv(file: UploadFile):
     """
     Comprehensive CV analysis using AI
     """
-    text = await extract_text_enhanced(file)
-    if not text.strip():
-        return {"error": "No text could be extracted from the file"}
-
-    # Extract skills using AI
-    skills = extract_skills(text)
-
-    # Detect language
-    language = detect_language(text)
-
-    # Get job matches
-    jobs = match_jobs(text)
+    # Every LLM call in this request shares one time budget
+    with llm_deadline(LLM_REQUEST_BUDGET):
+        text = await extract_text_enhanced(file)
+        if not text.strip():
+            return {"error": "No text could be extracted from the file"}
+
+        # Skill extraction, language detection and job matching run concurrently
+        skills, language, jobs = await asyncio.gather(
+            run_blocking(extract_skills, text),
+            run_blocking(detect_language, text),
+            run_blocking(match_jobs, text, k=5)
+        )
 
     return {
         "extracted_skills": list(skills),
         "skill_count": len(skills),
         "detected_language": language,
-        "top_job_matches": jobs[:5],
+        "top_job_matches": jobs,
         "text_length": len(text),
         "ai_powered": True
     }
@@ -312,6 +395,38 @@ async def extract_skills_endpoint(text: str):
         "ai_powered": True
     }
 
+@app.post("/jobs/upsert")
+def upsert_jobs_endpoint(jobs: List[JobPosting]):
+    """
+    Add or update job postings in the matching index (only changed postings are re-embedded)
+
+    Postings are stored, so they survive restarts and reach every worker
+    within JOBS_SYNC_INTERVAL seconds.
+    """
+    result = upsert_jobs([job.model_dump() for job in jobs])
+    return {"message": "Jobs indexed successfully", **result}
+
+@app.post("/jobs/reload")
+def reload_jobs_endpoint():
+    """
+    Re-read jobs_dataset.csv into a new job catalog version (used by matching and skill gap analysis alike)
+
+    Postings changed through /jobs/upsert and DELETE /jobs/{job_id} are kept;
+    every worker reloads on its next sync.
+    """
+    result = reload_catalog()
+    return {"message": "Job catalog reloaded", **result}
+
+@app.delete("/jobs/{job_id}")
+def delete_job_endpoint(job_id: str):
+    """
+    Remove a job posting from the matching index
+    """
+    result = delete_jobs([job_id])
+    if not result["deleted"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"message": "Job removed successfully", **result}
+
 @app.post("/chat")
 async def chat_endpoint(message: str = Form(...), speak_response: bool = Form(False), language: str = Form("en")):
     """
@@ -322,12 +437,6 @@ async def chat_endpoint(message: str = Form(...), speak_response: bool = Form(Fa
 
     # Always try Google AI directly (ignore startup flag)
     try:
-        import google.generativeai as genai
-
-        # Configure Google AI
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-
         # Build a simple prompt
         prompt = f"""
         You are SmartPath AI, an expert career counselor and job matching specialist.
@@ -346,8 +455,7 @@ async def chat_endpoint(message: str = Form(...), speak_response: bool = Form(Fa
         Keep your response concise but informative (under 200 words).
         """
 
-        response = model.generate_content(prompt)
-        ai_response = response.text.strip()
+        ai_response = (await generate_async(prompt, "chat")).strip()
 
         # Speak response if requested
         if speak_response and is_tts_available():
@@ -389,6 +497,29 @@ async def chat_endpoint(message: str = Form(...), speak_response: bool = Form(Fa
         }
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(message: str = Form(...), speak_response: bool = Form(False), language: str = Form("en")):
+    """
+    Chat with SmartPath AI Assistant, streaming the answer as Server-Sent Events
+
+    Emits one "token" event per chunk ({"text": ...}) as Gemini produces it,
+    then a "done" event with the full response (already saved to the chat
+    history) or an "error" event.
+    """
+    if not message.strip():
+        raise HTTPException(status_code=400, detail="No message provided")
+
+    def events():
+        for event in chat_with_ai_stream(message, speak_response, language):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    # The generator blocks on Gemini; StreamingResponse iterates it in a worker thread
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/speak")
 async def speak_endpoint(text: str = Form(...), language: str = Form("en")):
@@ -445,6 +576,20 @@ async def get_chat_suggestions_endpoint():
         "count": len(suggestions)
     }
 
+@app.get("/llm/stats")
+async def llm_stats_endpoint():
+    """
+    Get LLM gateway metrics (upstream calls, errors, latency) per call type
+    """
+    return {"metrics": get_metrics(), "cache_stats": cache_stats()}
+
+@app.get("/llm/cache/stats")
+async def llm_cache_stats_endpoint():
+    """
+    Get LLM response cache hit/miss counters per call type
+    """
+    return {"cache_stats": cache_stats()}
+
 @app.get("/tts/info")
 async def get_tts_info_endpoint():
     """
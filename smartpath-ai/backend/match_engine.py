@@ -1,32 +1,145 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer, util
-import os
+import numpy as np
 import logging
-from config import GOOGLE_API_KEY, GEMINI_MODEL, SIMILARITY_THRESHOLD
+from config import (
+    SIMILARITY_THRESHOLD,
+    MATCH_TOP_K, MATCH_MAX_K, AI_RERANK_TOP_K, CV_CHUNKING_ENABLED, CV_CHUNK_WORDS, CV_CHUNK_OVERLAP, CV_MAX_CHUNKS, CV_CHUNK_POOLING
+)
+import embedding_model
+from embedding_model import encode_texts
+from job_catalog import current_catalog
+from llm_gateway import generate, record_parse_failure
+from structured_output import SchemaError, looks_like_json, parse_json, schema_prompt
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
-# Get the directory of this script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-jobs_df = pd.read_csv(os.path.join(script_dir, "jobs_dataset.csv"))
+# Response shape requested from Gemini by match_jobs_with_ai
+JOB_MATCHES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"title": {"type": "string"}, "score": {"type": "number"}},
+        "required": ["title", "score"],
+    },
+}
+
+def warmup():
+    """
+    Load the embedding model, run a first forward pass and build the job
+    catalog, so the first /match request does not pay for them
+    """
+    embedding_model.warmup()
+    catalog = current_catalog()
+    logger.info(f"Job matching ready: {len(catalog)} jobs indexed")
+
+def chunk_text(text, size=CV_CHUNK_WORDS, overlap=CV_CHUNK_OVERLAP, max_chunks=CV_MAX_CHUNKS):
+    """
+    Split text into overlapping word windows that fit the encoder's input limit
+
+    When there are more windows than max_chunks, an evenly spaced subset is
+    kept so the whole CV is still covered.
+    """
+    words = text.split()
+    if not CV_CHUNKING_ENABLED or len(words) <= size:
+        return [text]
+
+    step = max(1, size - overlap)
+    starts = list(range(0, len(words) - overlap, step))
+    if len(starts) > max_chunks:
+        starts = [starts[i] for i in np.linspace(0, len(starts) - 1, max_chunks).round().astype(int)]
+    return [" ".join(words[start:start + size]) for start in starts]
+
+def pooled_query(index, chunk_embeds, k):
+    """
+    Query the index with all chunks of one CV and pool similarity per job
+
+    Mean pooling is exact as a single query with the mean chunk vector.
+    Max pooling merges each chunk's top-k, keeping every job's best score.
+    """
+    if len(chunk_embeds) == 1:
+        return index.query(chunk_embeds[0], k)
+    if CV_CHUNK_POOLING == "mean":
+        return index.query(chunk_embeds.mean(axis=0), k)
+
+    results = index.query_batch(chunk_embeds, k)
+    ids = np.concatenate([ids for ids, _ in results])
+    scores = np.concatenate([scores for _, scores in results])
+    order = np.argsort(-scores, kind="stable")
+    ids, scores = ids[order], scores[order]
+    _, first = np.unique(ids, return_index=True)
+    first = np.sort(first)[:k]
+    return ids[first], scores[first]
+
+def search_jobs(cv_text, k=MATCH_TOP_K, catalog=None):
+    """
+    Find the k jobs most similar to the CV
+
+    Returns:
+        Tuple of (job slots, cosine scores), best first
+    """
+    return search_jobs_batch([cv_text], k, catalog)[0]
 
-def match_jobs_with_ai(cv_text):
+def search_jobs_batch(cv_texts, k=MATCH_TOP_K, catalog=None):
+    """
+    Find the k most similar jobs for many CVs with one encoder batch
+
+    Returns:
+        List of (job slots, cosine scores) tuples, one per CV
+    """
+    catalog = catalog or current_catalog()
+    chunks = [chunk_text(text) for text in cv_texts]
+    embeds = encode_texts([chunk for cv_chunks in chunks for chunk in cv_chunks])
+
+    # Short CVs (one chunk) are scored together in one batched query
+    offsets = np.concatenate(([0], np.cumsum([len(cv_chunks) for cv_chunks in chunks])))
+    single = [i for i, cv_chunks in enumerate(chunks) if len(cv_chunks) == 1]
+    results = [None] * len(cv_texts)
+    if single:
+        for i, result in zip(single, catalog.index.query_batch(embeds[offsets[single]], k)):
+            results[i] = result
+    for i, cv_chunks in enumerate(chunks):
+        if results[i] is None:
+            results[i] = pooled_query(catalog.index, embeds[offsets[i]:offsets[i + 1]], k)
+    return results
+
+def select_matches(indices, scores, threshold, limit=None, catalog=None):
+    """
+    Turn best-first search results into match dicts for jobs above the threshold
+    """
+    catalog = catalog or current_catalog()
+    keep = scores > threshold
+    indices, scores = indices[keep][:limit], scores[keep][:limit]
+    titles = catalog.titles[catalog.rows(indices)]
+    return [{"title": title, "score": round(float(score) * 100, 2)} for title, score in zip(titles, scores)]
+
+def match_jobs_with_ai(cv_text, traditional_results=None, candidates=None, catalog=None):
     """
     AI-powered job matching that analyzes CV content and determines job capability
+
+    Only the AI_RERANK_TOP_K best embedding candidates are sent to Gemini for
+    re-ranking, so the prompt size does not grow with the job catalog.
+    candidates (job slots, best first) and traditional_results, when already
+    computed by the caller, are reused instead of running the semantic
+    search again; traditional_results are returned on failure.
     """
-    try:
-        import google.generativeai as genai
+    def fallback():
+        return traditional_results if traditional_results is not None else match_jobs_traditional(cv_text)
 
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model_ai = genai.GenerativeModel(GEMINI_MODEL)
+    try:
+        catalog = catalog or current_catalog()
+        if candidates is None:
+            candidates, _ = search_jobs(cv_text, AI_RERANK_TOP_K, catalog=catalog)
+        candidates = candidates[:AI_RERANK_TOP_K]
+        if not len(candidates):
+            return fallback()
 
         # Create detailed job analysis prompt
-        job_list = []
-        for _, row in jobs_df.iterrows():
-            job_list.append(f"- {row['title']}: {row['description']} (Required skills: {row['skills']})")
+        rows = catalog.rows(candidates)
+        job_list = [
+            f"- {title}: {description} (Required skills: {skills})"
+            for title, description, skills in zip(catalog.titles[rows], catalog.descriptions[rows], catalog.skills[rows])
+        ]
 
         prompt = f"""
         You are an expert career counselor and HR professional. Analyze this CV/resume and determine which jobs this person is CAPABLE of doing based on their skills, experience, and background.
@@ -34,7 +147,7 @@ def match_jobs_with_ai(cv_text):
         CV/Resume Content:
         {cv_text}
 
-        Available Jobs:
+        Candidate Jobs:
         {chr(10).join(job_list)}
 
         For each job, analyze:
@@ -50,14 +163,12 @@ def match_jobs_with_ai(cv_text):
         - 30-49: Basic qualification, significant training required
         - 0-29: Not suitable for this role
 
-        Return ONLY the results in this exact format (one per line):
-        Job Title: Score
-
-        Results:
+        Return ONLY a JSON array with one object per job, using the job title exactly as given, matching this schema:
+        {schema_prompt(JOB_MATCHES_SCHEMA)}
         """
 
-        response = model_ai.generate_content(prompt)
-        ai_results = parse_ai_job_matches(response.text)
+        candidate_titles = catalog.titles[rows].tolist()
+        ai_results = parse_ai_job_matches(generate(prompt, "match_jobs", json_output=True), candidate_titles)
 
         logger.info(f"AI analyzed {len(ai_results)} job matches")
 
@@ -67,18 +178,57 @@ def match_jobs_with_ai(cv_text):
         else:
             # Fallback to traditional matching if AI parsing failed
             logger.warning("AI parsing failed, falling back to traditional matching")
-            return match_jobs_traditional(cv_text)
+            return fallback()
 
     except ImportError:
         logger.warning("Google Generative AI not available, using traditional matching")
-        return match_jobs_traditional(cv_text)
+        return fallback()
     except Exception as e:
         logger.error(f"AI job matching error: {e}")
-        return match_jobs_traditional(cv_text)
+        return fallback()
 
-def parse_ai_job_matches(ai_response):
+def parse_ai_job_matches(ai_response, candidate_titles=None):
     """
     Parse AI response to extract job matches and scores
+
+    The JSON response is validated against JOB_MATCHES_SCHEMA; a response
+    that does not match is counted as a parse failure. A free-text reply is
+    read with the line-based "Job Title: Score" parser instead, while JSON
+    of the wrong shape yields no matches so the caller falls back to the
+    traditional results. When candidate_titles is given, titles the model
+    made up are dropped and the rest are returned in the catalog spelling.
+    """
+    try:
+        matches = parse_json(ai_response, JOB_MATCHES_SCHEMA)
+    except SchemaError as e:
+        record_parse_failure("match_jobs")
+        if looks_like_json(ai_response):
+            logger.warning(f"AI job matches do not match the schema ({e})")
+            return []
+        logger.warning(f"AI job matches are not JSON ({e}), parsing as text")
+        results = parse_ai_job_match_lines(ai_response)
+    else:
+        results = sorted(
+            (
+                {"title": match["title"].strip(), "score": float(match["score"])}
+                for match in matches
+                if match["title"].strip() and match["score"] >= 30  # Only include matches above 30%
+            ),
+            key=lambda x: x["score"], reverse=True
+        )
+
+    if candidate_titles is None:
+        return results
+    known = {title.casefold(): title for title in candidate_titles}
+    return [
+        {"title": known[result["title"].casefold()], "score": result["score"]}
+        for result in results
+        if result["title"].casefold() in known
+    ]
+
+def parse_ai_job_match_lines(ai_response):
+    """
+    Parse a free-text "Job Title: Score" response (one match per line)
     """
     results = []
     lines = ai_response.strip().split('\n')
@@ -108,18 +258,13 @@ def parse_ai_job_matches(ai_response):
 
     return sorted(results, key=lambda x: x["score"], reverse=True)
 
-def match_jobs_traditional(cv_text):
+def match_jobs_traditional(cv_text, k=MATCH_TOP_K):
     """
-    Traditional semantic matching using sentence transformers
+    Traditional semantic matching using sentence transformers (top k jobs)
     """
-    cv_embed = model.encode(cv_text, convert_to_tensor=True)
-    results = []
-    for _, row in jobs_df.iterrows():
-        job_embed = model.encode(row["description"], convert_to_tensor=True)
-        score = util.pytorch_cos_sim(cv_embed, job_embed).item()
-        if score > SIMILARITY_THRESHOLD:
-            results.append({"title": row["title"], "score": round(score*100, 2)})
-    return sorted(results, key=lambda x: x["score"], reverse=True)
+    catalog = current_catalog()
+    indices, scores = search_jobs(cv_text, k, catalog=catalog)
+    return select_matches(indices, scores, SIMILARITY_THRESHOLD, catalog=catalog)
 
 def combine_job_matches(ai_results, traditional_results):
     """
@@ -149,41 +294,73 @@ def combine_job_matches(ai_results, traditional_results):
 
     return sorted(final_results, key=lambda x: x["score"], reverse=True)
 
-def match_jobs(cv_text):
+def clamp_k(k):
+    """Keep a requested result count within 1..MATCH_MAX_K"""
+    return min(max(int(k), 1), MATCH_MAX_K)
+
+def match_jobs(cv_text, k=MATCH_TOP_K):
     """
     Main job matching function - tries AI first, falls back to traditional
-    """
-    # Always try traditional matching first to ensure we have results
-    traditional_results = match_jobs_traditional(cv_text)
 
-    # If traditional matching found results, try to enhance with AI
+    Returns at most k matches; only the top k job scores are ever selected
+    and turned into result dicts.
+    """
+    k = clamp_k(k)
+    # Score the CV once; every result set below is derived from this search
+    catalog = current_catalog()
+    indices, scores = search_jobs(cv_text, max(k, AI_RERANK_TOP_K), catalog=catalog)
+    search_results = (indices[:k], scores[:k])
+    traditional_results = select_matches(*search_results, SIMILARITY_THRESHOLD, catalog=catalog)
+
+    # If traditional matching found results, let AI re-rank the best candidates
     if traditional_results:
         try:
-            ai_results = match_jobs_with_ai(cv_text)
+            ai_results = match_jobs_with_ai(cv_text, traditional_results, candidates=indices, catalog=catalog)
             if ai_results and len(ai_results) > 0:
-                return ai_results
+                return ai_results[:k]
         except Exception as e:
             logger.warning(f"AI matching failed, using traditional results: {e}")
 
     # Return traditional results if AI fails or no traditional results
-    return traditional_results if traditional_results else get_fallback_matches(cv_text)
+    return traditional_results if traditional_results else get_fallback_matches(cv_text, search_results, catalog)[:k]
 
-def get_fallback_matches(cv_text):
+def get_fallback_matches(cv_text, search_results=None, catalog=None):
     """
     Fallback matching with very low threshold to ensure some results
+
+    search_results from an earlier search_jobs call are reused when given.
     """
-    cv_embed = model.encode(cv_text, convert_to_tensor=True)
-    results = []
-    for _, row in jobs_df.iterrows():
-        job_embed = model.encode(row["description"], convert_to_tensor=True)
-        score = util.pytorch_cos_sim(cv_embed, job_embed).item()
-        if score > 0.1:  # Very low threshold
-            results.append({"title": row["title"], "score": round(score*100, 2)})
+    catalog = catalog or current_catalog()
+    if search_results is None:
+        search_results = search_jobs(cv_text, k=5, catalog=catalog)
+    indices, scores = search_results
+    results = select_matches(indices, scores, 0.1, limit=5, catalog=catalog)  # Very low threshold
 
     # If still no results, return all jobs with basic scores
     if not results:
         logger.warning("No semantic matches found, returning all jobs with basic scoring")
-        for _, row in jobs_df.iterrows():
-            results.append({"title": row["title"], "score": 25.0})
+        results = [{"title": title, "score": 25.0} for title in catalog.titles[:5]]
+
+    return results
 
-    return sorted(results, key=lambda x: x["score"], reverse=True)[:5]
+def match_jobs_batch(cv_texts, k=MATCH_TOP_K):
+    """
+    Semantic job matching for many CVs at once (no per-CV AI calls)
+
+    All CVs are encoded in one batch and scored against the job matrix
+    together, so screening an applicant pool costs one forward pass per batch.
+
+    Returns:
+        List of match lists, aligned with cv_texts
+    """
+    cv_texts = list(cv_texts)
+    if not cv_texts:
+        return []
+
+    k = clamp_k(k)
+    catalog = current_catalog()
+    results = []
+    for search_results in search_jobs_batch(cv_texts, k, catalog):
+        matches = select_matches(*search_results, SIMILARITY_THRESHOLD, catalog=catalog)
+        results.append(matches or get_fallback_matches(None, search_results, catalog)[:k])
+    return results
@@ -0,0 +1,181 @@
+"""
+Client-side rate limiter for the Gemini quota
+
+Two token buckets, requests per minute and tokens per minute, are shared by
+every LLM call. Callers queue by priority: a waiting interactive call (chat)
+is always served before normal or background work in the same process, so
+bulk analysis cannot starve users when the quota is tight.
+
+With a state_path the bucket levels live in a SQLite file instead of process
+memory, so all workers on the host (gunicorn -w N) draw from one quota rather
+than each getting the full rate. Each take is one short write transaction;
+priority ordering still applies within each worker. If the file cannot be
+used, the worker falls back to its own in-memory buckets.
+"""
+import heapq
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+
+
+class TokenBucket:
+    """Bucket holding up to capacity units, refilled continuously at rate per second"""
+
+    def __init__(self, capacity: float, rate: float, now: float = None):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until amount units are available (after refill)"""
+        missing = amount - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class RateLimiter:
+    """Priority-ordered limiter over a requests bucket and a tokens bucket"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, state_path: str = None):
+        """
+        Args:
+            requests_per_minute: Requests bucket size and refill rate
+            tokens_per_minute: Tokens bucket size and refill rate
+            state_path: SQLite file holding the bucket levels shared by all
+                processes using it (None = buckets in this process only)
+        """
+        self.state_path = state_path
+        # Shared levels are compared across processes, so they need the wall clock
+        self._clock = time.time if state_path else time.monotonic
+        now = self._clock()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0, now)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, now)
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._db = None
+        self._pid = None
+        self._shared = bool(state_path)
+
+    def _conn(self):
+        """Connection for this process; a forked worker opens its own"""
+        if self._db is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.state_path, check_same_thread=False, timeout=5, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+            self._pid = os.getpid()
+        return self._db
+
+    def _update(self, take=None):
+        """
+        Refill both buckets and, when take is a token count, try to take one
+        request and that many tokens (caller holds the condition lock)
+
+        Returns:
+            Seconds until the take can succeed (0.0 once it has), or 0.0 without take
+        """
+        if self._shared:
+            try:
+                return self._update_shared(take)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Shared rate limit state unavailable, limiting this process only: {e}")
+                self._shared = False
+        return self._update_buckets(self._clock(), take)
+
+    def _update_buckets(self, now, take):
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        if take is None:
+            return 0.0
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(take))
+        if wait <= 0:
+            self.requests.level -= 1
+            self.tokens.level -= take
+        return wait
+
+    def _update_shared(self, take):
+        db = self._conn()
+        buckets = {"requests": self.requests, "tokens": self.tokens}
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            now = self._clock()
+            rows = {name: (level, updated) for name, level, updated in db.execute("SELECT * FROM buckets")}
+            for name, bucket in buckets.items():
+                # A new file starts with full buckets
+                bucket.level, bucket.updated = rows.get(name, (bucket.capacity, now))
+            wait = self._update_buckets(now, take)
+            if take is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                    [(name, bucket.level, bucket.updated) for name, bucket in buckets.items()],
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, tokens, priority="normal", timeout=None):
+        """
+        Block until one request and the given number of tokens are available
+
+        Args:
+            tokens: Estimated tokens for the call (capped at the bucket size)
+            priority: "interactive", "normal" or "background"
+            timeout: Maximum seconds to wait, None to wait indefinitely
+
+        Returns:
+            Seconds spent queued, or None if the timeout expired first
+        """
+        tokens = min(tokens, self.tokens.capacity)
+        entry = (PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._sequence))
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    if self._waiters[0] == entry:
+                        # With shared state another process may take the capacity
+                        # first; the wait is then recomputed
+                        wait = self._update(tokens)
+                        if wait <= 0:
+                            return time.monotonic() - start
+                    else:
+                        wait = None  # Woken when the head of the queue is served
+
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return None
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def stats(self):
+        """Current bucket levels and queue length"""
+        with self._cond:
+            self._update()
+            return {
+                "requests_available": round(self.requests.level, 2),
+                "tokens_available": round(self.tokens.level),
+                "queued": len(self._waiters),
+            }
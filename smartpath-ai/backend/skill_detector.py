@@ -1,27 +1,43 @@
-import re
-import pandas as pd
-import os
+import contextvars
 import logging
-from config import GOOGLE_API_KEY, GEMINI_MODEL
+from concurrent.futures import ThreadPoolExecutor
+from config import CAPABILITY_BATCH_SIZE, CAPABILITY_MAX_JOBS
+from llm_gateway import generate, record_parse_failure
+from job_catalog import current_catalog
+from skill_taxonomy import get_taxonomy
+from structured_output import SchemaError, looks_like_json, parse_json, schema_prompt
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Get the directory of this script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-jobs_df = pd.read_csv(os.path.join(script_dir, "jobs_dataset.csv"))
+# Response shapes requested from Gemini by the capability analysis calls
+_SKILL_LIST = {"type": "array", "items": {"type": "string"}}
+CAPABILITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "have_skills": _SKILL_LIST,
+        "missing_skills": _SKILL_LIST,
+        "transferable_skills": _SKILL_LIST,
+        "capability_score": {"type": "number"},
+        "reasoning": {"type": "string"},
+    },
+    "required": ["have_skills", "missing_skills", "capability_score"],
+}
+BATCH_CAPABILITY_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"title": {"type": "string"}, **CAPABILITY_SCHEMA["properties"]},
+        "required": ["title"] + CAPABILITY_SCHEMA["required"],
+    },
+}
 
 def extract_skills_with_ai(cv_text):
     """
     Extract skills and analyze capabilities using Google's Gemini AI
     """
     try:
-        import google.generativeai as genai
-
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-
         prompt = f"""
         You are an expert HR professional. Analyze this CV/resume and extract ALL skills, capabilities, and competencies this person has.
 
@@ -43,8 +59,7 @@ def extract_skills_with_ai(cv_text):
         Skills:
         """
 
-        response = model.generate_content(prompt)
-        skills_text = response.text.strip()
+        skills_text = generate(prompt, "extract_skills").strip()
 
         # Parse the response and clean up the skills
         ai_skills = []
@@ -58,7 +73,7 @@ def extract_skills_with_ai(cv_text):
 
         # Combine with keyword-based extraction for completeness
         keyword_skills = extract_skills_keywords(cv_text)
-        all_skills = set(ai_skills + list(keyword_skills))
+        all_skills = set(get_taxonomy().canonical_names(ai_skills)) | keyword_skills
 
         logger.info(f"AI extracted {len(ai_skills)} skills, keyword method found {len(keyword_skills)} skills, total: {len(all_skills)}")
         return all_skills
@@ -72,27 +87,13 @@ def extract_skills_with_ai(cv_text):
 
 def extract_skills_keywords(cv_text):
     """
-    Fallback keyword-based skill extraction
-    """
-    skills_keywords = [
-        "Python", "SQL", "Excel", "Data Analysis", "HTML", "CSS", "JavaScript", "React",
-        "Circuits", "Troubleshooting", "Safety", "Digital Marketing", "SEO", "Social Media",
-        "Photoshop", "Illustrator", "UI/UX Design", "Project Planning", "Team Leadership",
-        "Agile", "Communication", "Customer Service", "Android", "iOS", "Flutter",
-        "React Native", "Machine Learning", "Data Modeling", "Visualization",
-        "Creative Writing", "Copywriting", "Research", "Project Management",
-        "Leadership", "Marketing", "Design", "Programming", "Database", "Web Development",
-        "Java", "C++", "C#", "PHP", "Ruby", "Swift", "Kotlin", "TypeScript",
-        "Node.js", "Angular", "Vue.js", "Django", "Flask", "Spring", "Laravel",
-        "MongoDB", "PostgreSQL", "MySQL", "Redis", "Docker", "Kubernetes",
-        "AWS", "Azure", "Google Cloud", "Git", "Jenkins", "Terraform",
-        "Scrum", "Kanban", "DevOps", "CI/CD", "Testing", "QA", "Automation"
-    ]
-    found = []
-    for skill in skills_keywords:
-        if re.search(rf"\b{skill}\b", cv_text, re.IGNORECASE):
-            found.append(skill)
-    return set(found)
+    Fallback keyword-based skill extraction (single pass over the CV)
+
+    Any alias in the skill taxonomy counts; skills are returned under their
+    canonical names.
+    """
+    taxonomy = get_taxonomy()
+    return {taxonomy.names[skill_id] for skill_id in taxonomy.extract(cv_text)}
 
 def extract_skills(cv_text):
     """
@@ -105,11 +106,6 @@ def analyze_cv_for_job_capability(cv_text, job_title, job_description, required_
     Use AI to analyze if the person is capable of doing a specific job
     """
     try:
-        import google.generativeai as genai
-
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-
         prompt = f"""
         You are an expert career counselor. Analyze this CV and determine the person's capability for the specific job.
 
@@ -126,24 +122,139 @@ def analyze_cv_for_job_capability(cv_text, job_title, job_description, required_
         3. What transferable skills do they have?
         4. Overall capability assessment
 
-        Respond in this exact format:
-        HAVE_SKILLS: skill1, skill2, skill3
-        MISSING_SKILLS: skill4, skill5, skill6
-        TRANSFERABLE_SKILLS: skill7, skill8
-        CAPABILITY_SCORE: 85
-        REASONING: Brief explanation of why they are/aren't suitable
+        Respond with a JSON object matching this schema (capability_score is 0-100,
+        reasoning briefly explains why they are/aren't suitable):
+        {schema_prompt(CAPABILITY_SCHEMA)}
         """
 
-        response = model.generate_content(prompt)
-        return parse_capability_analysis(response.text)
+        return parse_capability_analysis(generate(prompt, "capability", json_output=True))
 
     except Exception as e:
         logger.error(f"AI capability analysis error: {e}")
         return None
 
+def analyze_cv_for_jobs_batch(cv_text, jobs):
+    """
+    Use AI to analyze the person's capability for several jobs in one call
+
+    Args:
+        cv_text: CV content, sent once for all jobs
+        jobs: List of dicts with title, description and skills
+
+    Returns:
+        Dict mapping lower-cased job title to its parsed analysis (jobs the
+        model skipped are absent), or None if the AI call failed
+    """
+    try:
+        job_list = []
+        for i, job in enumerate(jobs, 1):
+            job_list.append(
+                f"{i}. Job: {job['title']}\n"
+                f"   Description: {job['description']}\n"
+                f"   Required Skills: {job['skills']}"
+            )
+
+        prompt = f"""
+        You are an expert career counselor. Analyze this CV and determine the person's capability for EACH of the jobs listed below.
+
+        CV Content:
+        {cv_text}
+
+        Jobs:
+        {chr(10).join(job_list)}
+
+        For each job analyze:
+        1. Which required skills does the person have?
+        2. Which skills are they missing?
+        3. What transferable skills do they have?
+        4. Overall capability assessment
+
+        Respond with a JSON array holding one object per job, using the job title exactly as given,
+        matching this schema (capability_score is 0-100, reasoning briefly explains why they are/aren't suitable):
+        {schema_prompt(BATCH_CAPABILITY_SCHEMA)}
+        """
+
+        return parse_batch_capability_analysis(generate(prompt, "capability", json_output=True))
+
+    except Exception as e:
+        logger.error(f"AI batch capability analysis error: {e}")
+        return None
+
+def parse_batch_capability_analysis(ai_response):
+    """
+    Parse a batched capability response into a dict keyed by lower-cased title
+
+    The JSON response is validated against BATCH_CAPABILITY_SCHEMA; a
+    response that does not match is counted as a parse failure. A free-text
+    reply is read with the "JOB:" block parser instead, while JSON of the
+    wrong shape returns None so the traditional analysis is used.
+    """
+    try:
+        analyses = parse_json(ai_response, BATCH_CAPABILITY_SCHEMA)
+    except SchemaError as e:
+        record_parse_failure("capability")
+        if looks_like_json(ai_response):
+            logger.warning(f"Batch capability analysis does not match the schema ({e})")
+            return None
+        logger.warning(f"Batch capability analysis is not JSON ({e}), parsing as text")
+        return parse_batch_capability_blocks(ai_response)
+    return {analysis["title"].strip().lower(): capability_result(analysis) for analysis in analyses}
+
+def parse_batch_capability_blocks(ai_response):
+    """
+    Split a free-text batched capability response into "JOB:" blocks and parse each one
+    """
+    results = {}
+    title = None
+    block = []
+    for line in ai_response.strip().split('\n') + ["JOB:"]:
+        stripped = line.strip().lstrip('*#- ').replace('**', '')
+        if stripped.upper().startswith("JOB:"):
+            if title:
+                results[title.lower()] = parse_capability_lines("\n".join(block))
+            title = stripped[4:].strip()
+            block = []
+        else:
+            block.append(stripped)
+    return results
+
 def parse_capability_analysis(ai_response):
     """
     Parse AI capability analysis response
+
+    The JSON response is validated against CAPABILITY_SCHEMA; a response
+    that does not match is counted as a parse failure. A free-text reply is
+    read with the line-prefixed text parser instead, while JSON of the wrong
+    shape returns None so the traditional analysis is used.
+    """
+    try:
+        return capability_result(parse_json(ai_response, CAPABILITY_SCHEMA))
+    except SchemaError as e:
+        record_parse_failure("capability")
+        if looks_like_json(ai_response):
+            logger.warning(f"Capability analysis does not match the schema ({e})")
+            return None
+        logger.warning(f"Capability analysis is not JSON ({e}), parsing as text")
+        return parse_capability_lines(ai_response)
+
+def capability_result(analysis):
+    """
+    Normalize a schema-validated capability analysis into the result dict
+    """
+    def skills(name):
+        return [skill.strip() for skill in analysis.get(name, []) if skill.strip()]
+
+    return {
+        "have_skills": skills("have_skills"),
+        "missing_skills": skills("missing_skills"),
+        "transferable_skills": skills("transferable_skills"),
+        "capability_score": int(round(analysis["capability_score"])),
+        "reasoning": analysis.get("reasoning", "").strip() or "Analysis not available"
+    }
+
+def parse_capability_lines(ai_response):
+    """
+    Parse a free-text capability response (HAVE_SKILLS:, MISSING_SKILLS:, ... lines)
     """
     result = {
         "have_skills": [],
@@ -175,59 +286,71 @@ def parse_capability_analysis(ai_response):
 
     return result
 
-def detect_skill_gaps(cv_text, matched_jobs):
+def detect_skill_gaps(cv_text, matched_jobs, cv_skills=None):
     """
     Enhanced skill gap detection using AI analysis
+
+    The first CAPABILITY_MAX_JOBS matched jobs are analyzed in batched AI
+    calls (CAPABILITY_BATCH_SIZE jobs each) that run concurrently under the
+    caller's LLM deadline; single-job calls are only made for jobs missing
+    from a batch response. The remaining jobs get traditional analysis.
+    cv_skills, if already extracted by the caller, is reused for the
+    traditional fallback; otherwise skills are extracted only when needed.
     """
-    cv_skills = extract_skills(cv_text)
     results = []
-
-    # Ensure we have some skills detected
-    if not cv_skills:
-        logger.warning("No skills detected from CV, using basic skill detection")
-        cv_skills = {"Communication", "Problem Solving", "Teamwork"}
-
+    skills_cache = {}
+    taxonomy = get_taxonomy()
+
+    def get_cv_skill_keys():
+        # Taxonomy ids (names for skills outside the taxonomy), compared as sets
+        if "keys" not in skills_cache:
+            skills = cv_skills if cv_skills is not None else extract_skills(cv_text)
+            # Ensure we have some skills detected
+            if not skills:
+                logger.warning("No skills detected from CV, using basic skill detection")
+                skills = {"Communication", "Problem Solving", "Teamwork"}
+            skills_cache["keys"] = taxonomy.skill_keys(skills).keys()
+        return skills_cache["keys"]
+
+    # Look up every matched job (one dict lookup each), then analyze them in batches
+    catalog = current_catalog()
+    rows = {}
     for job in matched_jobs:
-        try:
-            row = jobs_df[jobs_df["title"] == job["title"]].iloc[0]
-            required_skills_str = row["skills"]
-
-            # Use AI to analyze capability for this specific job
-            ai_analysis = analyze_cv_for_job_capability(
-                cv_text,
-                job["title"],
-                row["description"],
-                required_skills_str
-            )
+        record = catalog.find(job["title"])
+        if record is not None:
+            rows[job["title"]] = record
+
+    def analyze_batch(batch_titles):
+        batch = [
+            {"title": title, "description": rows[title].description, "skills": rows[title].skills}
+            for title in batch_titles
+        ]
+        batch_results = analyze_cv_for_jobs_batch(cv_text, batch)
+        if batch_results is None:
+            return {}  # Upstream failed: use traditional analysis for this batch
+        batch_analyses = {}
+        for job in batch:
+            analysis = batch_results.get(job["title"].lower())
+            if analysis is None:
+                # Model skipped this job: ask about it on its own
+                analysis = analyze_cv_for_job_capability(cv_text, job["title"], job["description"], job["skills"])
+            batch_analyses[job["title"]] = analysis
+        return batch_analyses
+
+    analyses = {}
+    titles = list(rows)[:CAPABILITY_MAX_JOBS]
+    batches = [titles[start:start + CAPABILITY_BATCH_SIZE] for start in range(0, len(titles), CAPABILITY_BATCH_SIZE)]
+    if len(batches) > 1:
+        # Each batch runs in a copy of this context, so the request's LLM deadline and priority still apply
+        with ThreadPoolExecutor(len(batches)) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, analyze_batch, batch) for batch in batches]
+            for future in futures:
+                analyses.update(future.result())
+    elif batches:
+        analyses.update(analyze_batch(batches[0]))
 
-            if ai_analysis:
-                # Use AI analysis results
-                results.append({
-                    "title": job["title"],
-                    "score": job["score"],
-                    "have_skills": ai_analysis["have_skills"],
-                    "missing_skills": ai_analysis["missing_skills"],
-                    "transferable_skills": ai_analysis.get("transferable_skills", []),
-                    "capability_score": ai_analysis.get("capability_score", job["score"]),
-                    "reasoning": ai_analysis.get("reasoning", "")
-                })
-            else:
-                # Fallback to traditional analysis
-                required_skills = set(required_skills_str.split(";"))
-                missing = required_skills - cv_skills
-                have_skills = cv_skills & required_skills
-
-                results.append({
-                    "title": job["title"],
-                    "score": job["score"],
-                    "have_skills": list(have_skills),
-                    "missing_skills": list(missing),
-                    "transferable_skills": [],
-                    "capability_score": job["score"],
-                    "reasoning": "Traditional skill matching analysis"
-                })
-
-        except IndexError:
+    for job in matched_jobs:
+        if job["title"] not in rows:
             # If job not found in dataset, return basic info
             logger.warning(f"Job '{job['title']}' not found in dataset")
             results.append({
@@ -239,5 +362,35 @@ def detect_skill_gaps(cv_text, matched_jobs):
                 "capability_score": job["score"],
                 "reasoning": "Job details not found in database"
             })
+            continue
+
+        ai_analysis = analyses.get(job["title"])
+        if ai_analysis:
+            # Use AI analysis results
+            results.append({
+                "title": job["title"],
+                "score": job["score"],
+                "have_skills": ai_analysis["have_skills"],
+                "missing_skills": ai_analysis["missing_skills"],
+                "transferable_skills": ai_analysis.get("transferable_skills", []),
+                "capability_score": ai_analysis.get("capability_score", job["score"]),
+                "reasoning": ai_analysis.get("reasoning", "")
+            })
+        else:
+            # Fallback to traditional analysis
+            cv_skill_keys = get_cv_skill_keys()
+            required_skills = rows[job["title"]].required_skills
+            have_skills = [name for key, name in required_skills.items() if key in cv_skill_keys]
+            missing = [name for key, name in required_skills.items() if key not in cv_skill_keys]
+
+            results.append({
+                "title": job["title"],
+                "score": job["score"],
+                "have_skills": have_skills,
+                "missing_skills": missing,
+                "transferable_skills": [],
+                "capability_score": job["score"],
+                "reasoning": "Traditional skill matching analysis"
+            })
 
     return results
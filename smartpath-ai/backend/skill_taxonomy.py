@@ -0,0 +1,124 @@
+"""
+Skill taxonomy for SmartPath AI
+
+Canonical skills (integer id, name, category) and their aliases are loaded
+once from skills_taxonomy.csv (SKILL_TAXONOMY_PATH). Every alias, the
+canonical name included, is indexed in a hash map from its normalized form
+to the canonical id, so the job, course and CV spellings of a skill ("JS",
+"JavaScript", "javascript") resolve to the same id and skill sets can be
+compared as sets of ints. New skills and aliases are added by editing the
+CSV, not the code.
+
+The ids and categories belong to the CSV alone. They are not the
+AUTO_INCREMENT ids of the MySQL skills table, which is seeded in a different
+order, nor its categories, which come through skill_categories ->
+job_categories, so taxonomy ids must not be stored in or joined against the
+database. Ids only need to stay stable within the CSV; append new rows
+rather than renumbering.
+"""
+import logging
+import threading
+
+import pandas as pd
+
+from config import SKILL_TAXONOMY_PATH
+from keyword_matcher import KeywordMatcher, normalize
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SkillTaxonomy:
+    """Canonical skills with alias -> id and id -> record indexes"""
+
+    def __init__(self, skills):
+        """
+        Args:
+            skills: Iterable of (id, name, category, aliases) tuples
+        """
+        self.names = {}
+        self.categories = {}
+        self.alias_ids = {}
+
+        for skill_id, name, category, aliases in skills:
+            skill_id = int(skill_id)
+            self.names[skill_id] = name
+            self.categories[skill_id] = category
+            for alias in [name, *aliases]:
+                key = normalize(alias)
+                if not key:
+                    continue
+                other = self.alias_ids.setdefault(key, skill_id)
+                if other != skill_id:
+                    logger.warning(f"Skill alias '{alias}' maps to both {self.names[other]} and {name}, keeping {self.names[other]}")
+
+        # One automaton over every alias, for single-pass extraction from free text
+        self.matcher = KeywordMatcher(self.alias_ids)
+
+    @classmethod
+    def load(cls, path=SKILL_TAXONOMY_PATH):
+        """Load the taxonomy CSV (id, name, category, aliases separated by ';')"""
+        df = pd.read_csv(path, dtype={"name": str, "category": str, "aliases": str}, keep_default_na=False)
+        taxonomy = cls(
+            (row.id, row.name.strip(), row.category.strip(), [a.strip() for a in row.aliases.split(";") if a.strip()])
+            for row in df.itertuples(index=False)
+        )
+        logger.info(f"Loaded skill taxonomy: {len(taxonomy.names)} skills, {len(taxonomy.alias_ids)} aliases")
+        return taxonomy
+
+    def resolve(self, name):
+        """Canonical id for a skill name or alias, or None if unknown"""
+        return self.alias_ids.get(normalize(name))
+
+    def resolve_many(self, names):
+        """Set of canonical ids for the known names (unknown names are dropped)"""
+        ids = (self.alias_ids.get(normalize(name)) for name in names)
+        return {skill_id for skill_id in ids if skill_id is not None}
+
+    def canonical(self, name):
+        """Canonical spelling of a skill name, or the name itself if unknown"""
+        skill_id = self.resolve(name)
+        return self.names[skill_id] if skill_id is not None else name.strip()
+
+    def canonical_names(self, names):
+        """Canonical spellings of several names, deduplicated in order"""
+        return list(dict.fromkeys(self.canonical(name) for name in names if name.strip()))
+
+    def extract(self, text):
+        """Ids of all skills mentioned in free text (one pass, alias-aware)"""
+        return {self.alias_ids[alias] for alias in self.matcher.find(text)}
+
+    def skill_keys(self, names):
+        """
+        Map names to comparable keys: the canonical id for known skills and
+        the normalized name for unknown ones
+
+        Returns:
+            Dict of key -> display name (canonical spelling when known)
+        """
+        keys = {}
+        for name in names:
+            if not name.strip():
+                continue
+            skill_id = self.resolve(name)
+            key = skill_id if skill_id is not None else normalize(name)
+            keys.setdefault(key, self.names[skill_id] if skill_id is not None else name.strip())
+        return keys
+
+    def __len__(self):
+        return len(self.names)
+
+
+_taxonomy = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy():
+    """Return the process-wide taxonomy, loading it on first call"""
+    global _taxonomy
+    if _taxonomy is None:
+        with _taxonomy_lock:
+            if _taxonomy is None:
+                _taxonomy = SkillTaxonomy.load()
+    return _taxonomy
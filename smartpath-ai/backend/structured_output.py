@@ -0,0 +1,90 @@
+"""
+Validated parsing of JSON responses from Gemini
+
+Calls that need machine-readable output ask for JSON (see
+generate(..., json_output=True)) and describe the expected shape with a
+small JSON-schema subset: object (properties, required), array (items),
+string, integer, number and boolean. parse_json() decodes and validates a
+response in one pass; anything that does not match raises SchemaError so
+callers can count the failure and fall back. Only replies that are not JSON
+at all (see looks_like_json) are worth reading with a free-text parser.
+"""
+import json
+import re
+
+
+class SchemaError(ValueError):
+    """The response is not valid JSON or does not match the schema"""
+
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+
+def parse_json(text, schema):
+    """
+    Decode a JSON response and validate it against schema
+
+    Raises:
+        SchemaError: Invalid JSON or schema mismatch
+    """
+    text = (text or "").strip()
+    fenced = _FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise SchemaError(f"Invalid JSON: {e}") from e
+
+    try:
+        validate(value, schema)
+    except SchemaError as e:
+        # Models often wrap the requested value in one key ({"jobs": [...]})
+        if not (isinstance(value, dict) and len(value) == 1):
+            raise
+        try:
+            value = next(iter(value.values()))
+            validate(value, schema)
+        except SchemaError:
+            raise e from None
+    return value
+
+
+def looks_like_json(text):
+    """True if a reply is (fenced) JSON rather than free text"""
+    return (text or "").lstrip().startswith(("{", "[", "```"))
+
+
+def validate(value, schema, path="$"):
+    """Raise SchemaError if value does not match schema"""
+    expected = schema.get("type")
+    if expected:
+        python_type = _TYPES[expected]
+        # bool is a subclass of int but never a valid number here
+        if not isinstance(value, python_type) or (isinstance(value, bool) and expected != "boolean"):
+            raise SchemaError(f"{path}: expected {expected}, got {type(value).__name__}")
+
+    if expected == "object":
+        for name in schema.get("required", ()):
+            if name not in value:
+                raise SchemaError(f"{path}: missing required field '{name}'")
+        for name, field_schema in schema.get("properties", {}).items():
+            if name in value:
+                validate(value[name], field_schema, f"{path}.{name}")
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            validate(item, schema["items"], f"{path}[{i}]")
+
+
+def schema_prompt(schema):
+    """The schema rendered for inclusion in a prompt"""
+    return json.dumps(schema, indent=2)
@@ -0,0 +1,11 @@
+"""
+Unit tests for the backend modules that run without network access, a
+Gemini key or torch. Backend modules import each other by plain name
+(from config import ...), so the backend directory goes on sys.path.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import match_engine
+from match_engine import chunk_text, pooled_query
+from vector_index import create_index
+
+
+def words(n):
+    return " ".join(f"w{i}" for i in range(n))
+
+
+def unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(autouse=True)
+def chunking_enabled(monkeypatch):
+    monkeypatch.setattr(match_engine, "CV_CHUNKING_ENABLED", True)
+
+
+def test_short_text_is_one_chunk():
+    text = words(10)
+    assert chunk_text(text, size=20, overlap=5) == [text]
+
+
+def test_chunks_overlap_and_cover_the_text():
+    chunks = chunk_text(words(50), size=20, overlap=5, max_chunks=10)
+    assert [chunk.split()[0] for chunk in chunks] == ["w0", "w15", "w30"]
+    assert all(len(chunk.split()) <= 20 for chunk in chunks)
+    assert chunks[-1].split()[-1] == "w49"
+
+
+def test_long_text_keeps_evenly_spaced_chunks():
+    chunks = chunk_text(words(1000), size=20, overlap=5, max_chunks=4)
+    assert len(chunks) == 4
+    assert chunks[0].split()[0] == "w0"
+    assert chunks[-1].split()[-1] == "w999"
+
+
+@pytest.fixture
+def index():
+    return create_index("exact").build(unit_vectors(50), np.arange(100, 150))
+
+
+def test_single_chunk_is_a_plain_query(index):
+    query = unit_vectors(1, seed=1)
+    for a, b in zip(pooled_query(index, query, 5), index.query(query[0], 5)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_mean_pooling_scores_every_job_by_mean_similarity(index, monkeypatch):
+    monkeypatch.setattr(match_engine, "CV_CHUNK_POOLING", "mean")
+    chunks = unit_vectors(3, seed=2)
+    ids, scores = pooled_query(index, chunks, 50)
+    expected = (unit_vectors(50) @ chunks.T).mean(axis=1)
+    np.testing.assert_allclose(scores, expected[ids - 100], atol=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_max_pooling_keeps_each_jobs_best_chunk(index, monkeypatch):
+    monkeypatch.setattr(match_engine, "CV_CHUNK_POOLING", "max")
+    chunks = unit_vectors(3, seed=2)
+    ids, scores = pooled_query(index, chunks, 10)
+    best = (unit_vectors(50) @ chunks.T).max(axis=1)
+    assert len(set(ids.tolist())) == len(ids) == 10
+    np.testing.assert_allclose(scores, best[ids - 100], atol=1e-5)
+    np.testing.assert_allclose(scores, np.sort(best)[::-1][:10], atol=1e-5)
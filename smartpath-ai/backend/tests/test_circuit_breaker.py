@@ -0,0 +1,132 @@
+import time
+from collections import defaultdict
+
+import pytest
+
+import llm_gateway
+from llm_gateway import CircuitBreaker, CircuitOpenError, EmptyResponseError
+
+
+def open_breaker(reset_timeout=0.05):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=reset_timeout)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_one_trial_through_and_success_closes():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Only one trial at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_trial_opens_again():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_trial_slot_can_be_taken_again():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.release_trial()
+    breaker.before_call()
+    assert breaker.trial_in_flight
+
+
+class FakeResponse:
+    def __init__(self, text=None):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("The response has no parts: the candidate was blocked for SAFETY")
+        return self._text
+
+
+class FakeClient:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return [self.outcome] if stream else self.outcome
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "_limiter", None)
+    monkeypatch.setattr(llm_gateway, "_breakers", defaultdict(lambda: CircuitBreaker(failure_threshold=2, reset_timeout=60)))
+
+    def call(outcome, stream=False):
+        monkeypatch.setattr(llm_gateway, "get_client", lambda model_name: FakeClient(outcome))
+        if stream:
+            return "".join(llm_gateway.generate_stream("prompt", "test-breaker", model_name="m", use_cache=False))
+        return llm_gateway.generate("prompt", "test-breaker", model_name="m", use_cache=False)
+
+    return call
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("response", [FakeResponse(None), FakeResponse("")])
+def test_blocked_or_empty_replies_do_not_open_the_breaker(gateway, response, stream):
+    for _ in range(3):
+        with pytest.raises(EmptyResponseError):
+            gateway(response, stream)
+    assert llm_gateway._breakers["m"].state == "closed"
+    assert gateway(FakeResponse("ok"), stream) == "ok"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_timeouts_and_transport_errors_open_the_breaker(gateway, stream):
+    for error in (TimeoutError("slow"), ConnectionError("reset")):
+        with pytest.raises(type(error)):
+            gateway(error, stream)
+    assert llm_gateway._breakers["m"].state == "open"
+    with pytest.raises(CircuitOpenError):
+        gateway(FakeResponse("ok"), stream)
+
+
+def test_request_errors_do_not_open_the_breaker(gateway):
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            gateway(KeyError("bad request"))
+    assert llm_gateway._breakers["m"].state == "closed"
+
+
+def test_request_error_frees_the_half_open_trial(gateway):
+    breaker = llm_gateway._breakers["m"]
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.opened_at -= 60
+    with pytest.raises(KeyError):
+        gateway(KeyError("bad request"))
+    assert breaker.state == "half_open" and not breaker.trial_in_flight
@@ -0,0 +1,107 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import embedding_model
+import job_catalog
+from skill_taxonomy import get_taxonomy
+
+JOBS = [
+    {"title": "Data Analyst", "description": "Analyze data with SQL", "skills": "SQL;Excel;Tableau"},
+    {"title": "Web Developer", "description": "Build web apps", "skills": "JS;HTML5;CSS"},
+    {"title": "Mobile Developer", "description": "Build mobile apps", "skills": "Flutter;Kotlin"},
+]
+
+
+def fake_encode(texts):
+    """Deterministic unit vectors from a hash of each text"""
+    seeds = [int(hashlib.sha256(text.encode()).hexdigest()[:8], 16) for text in texts]
+    vectors = np.array([np.random.default_rng(seed).standard_normal(8) for seed in seeds], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def catalog_module(tmp_path, monkeypatch):
+    dataset = tmp_path / "jobs_dataset.csv"
+    pd.DataFrame(JOBS).to_csv(dataset, index=False)
+    monkeypatch.setattr(embedding_model, "_encode_with_model", fake_encode)
+    monkeypatch.setattr(embedding_model, "get_embedding_cache", lambda: None)
+    monkeypatch.setattr(job_catalog, "JOBS_DATASET_PATH", str(dataset))
+    monkeypatch.setattr(job_catalog, "JOBS_STORE_PATH", str(tmp_path / "store" / "postings.sqlite3"))
+    monkeypatch.setattr(job_catalog, "JOB_INDEX_TYPE", "exact")
+    monkeypatch.setattr(job_catalog, "JOBS_SYNC_INTERVAL", 0)
+    monkeypatch.setattr(job_catalog, "_catalog", None)
+    monkeypatch.setattr(job_catalog, "_synced_seq", 0)
+    monkeypatch.setattr(job_catalog, "_generation", 0)
+    return job_catalog
+
+
+def expected_skills(skills):
+    return get_taxonomy().skill_keys(skills.split(";"))
+
+
+def assert_consistent(catalog):
+    """Every row's carried-over skills and vector match a fresh parse/encode"""
+    for row in range(len(catalog)):
+        assert catalog.required_skills(row) == expected_skills(catalog.skills[row])
+    np.testing.assert_allclose(catalog.vectors(catalog.slots), fake_encode(catalog.descriptions.tolist()), atol=1e-6)
+    assert sorted(catalog.index.ids.tolist()) == catalog.slots.tolist()
+
+
+def test_load_resolves_skills_to_taxonomy_ids(catalog_module):
+    catalog = catalog_module.current_catalog()
+    record = catalog.find("web developer")
+    assert record.title == "Web Developer"
+    taxonomy = get_taxonomy()
+    assert set(record.required_skills) == {taxonomy.resolve("JavaScript"), taxonomy.resolve("HTML"), taxonomy.resolve("CSS")}
+    # Skills outside the taxonomy keep their name
+    assert "tableau" in catalog.find("Data Analyst").required_skills
+    assert_consistent(catalog)
+
+
+def test_catalog_is_shared_until_reloaded(catalog_module):
+    catalog = catalog_module.current_catalog()
+    assert catalog_module.current_catalog() is catalog
+    assert catalog.vectors(catalog.slots).shape == (len(JOBS), 8)
+    catalog_module.reload_catalog()
+    assert catalog_module.current_catalog() is not catalog
+
+
+def test_skills_carry_over_after_upsert_and_delete(catalog_module):
+    before = catalog_module.current_catalog()
+    result = catalog_module.upsert_jobs([
+        {"id": "Web Developer", "title": "Web Developer", "description": "Build web apps", "skills": "React;Node.js"},
+        {"id": "new-1", "title": "Cloud Engineer", "description": "Run clusters", "skills": "K8s;AWS;Pulumi"},
+        {"id": "Data Analyst", **JOBS[0]},
+    ])
+    assert result["added"] == 1 and result["updated"] == 1 and result["unchanged"] == 1
+
+    after = catalog_module.current_catalog()
+    assert after.version > before.version
+    assert set(after.find("Web Developer").required_skills.values()) == {"React", "Node.js"}
+    assert set(after.find("cloud engineer").required_skills.values()) == {"Kubernetes", "AWS", "Pulumi"}
+    assert_consistent(after)
+
+    assert catalog_module.delete_jobs(["Data Analyst", "missing"])["deleted"] == 1
+    final = catalog_module.current_catalog()
+    assert final.find("Data Analyst") is None
+    assert set(final.find("Mobile Developer").required_skills.values()) == {"Flutter", "Kotlin"}
+    assert_consistent(final)
+
+    # Older versions stay valid for readers that still hold them
+    assert before.find("Data Analyst") is not None
+    assert_consistent(before)
+
+
+def test_changes_survive_a_reload(catalog_module):
+    catalog_module.current_catalog()
+    catalog_module.upsert_jobs([{"id": "new-1", "title": "Cloud Engineer", "description": "Run clusters", "skills": "AWS"}])
+    catalog_module.delete_jobs(["Mobile Developer"])
+    catalog_module.reload_catalog()
+
+    catalog = catalog_module.current_catalog()
+    assert catalog.find("Cloud Engineer") is not None
+    assert catalog.find("Mobile Developer") is None
+    assert_consistent(catalog)
@@ -0,0 +1,37 @@
+from keyword_matcher import KeywordMatcher, normalize
+
+
+def test_normalize_casefolds_and_collapses_whitespace():
+    assert normalize("  Machine \n  LEARNING ") == "machine learning"
+
+
+def test_symbol_keywords_match_on_word_boundaries():
+    matcher = KeywordMatcher(["C++", "C#", "Node.js", "Java", "JavaScript"])
+    found = matcher.find("Built services in C++ and C#, plus Node.js and JavaScript tooling.")
+    assert found == {"C++", "C#", "Node.js", "JavaScript"}
+    assert matcher.find("C++11, C#8 and Node.jsx") == set()
+
+
+def test_keywords_inside_longer_words_do_not_match():
+    matcher = KeywordMatcher(["Java", "SQL", "R"])
+    assert matcher.find("JavaScript, MySQL and React") == set()
+    assert matcher.find("Java, SQL and R.") == {"Java", "SQL", "R"}
+
+
+def test_matching_is_case_insensitive_and_spans_whitespace():
+    matcher = KeywordMatcher(["Machine Learning"])
+    assert matcher.find("machine\n   LEARNING engineer") == {"Machine Learning"}
+
+
+def test_overlapping_keywords_are_all_reported():
+    # A keyword inside a longer one still counts when it is not glued to letters
+    matcher = KeywordMatcher(["React", "React Native", "C"])
+    assert matcher.find("Shipped apps with React Native") == {"React", "React Native"}
+    assert matcher.find("Wrote C and C++") == {"C"}
+    assert matcher.find("CSS and ObjC") == set()
+
+
+def test_duplicate_keywords_are_indexed_once():
+    matcher = KeywordMatcher(["SQL", "sql", " SQL "])
+    assert len(matcher) == 1
+    assert matcher.find_ids("sql") == {0}
@@ -0,0 +1,76 @@
+import sqlite3
+import time
+
+import pytest
+
+from llm_cache import LLMCache, prompt_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "llm" / "responses.sqlite3"), max_memory_entries=2)
+
+
+def rows(cache):
+    return cache._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def test_prompt_key_ignores_whitespace_but_not_model():
+    assert prompt_key("m", "a  b\n c ") == prompt_key("m", "a b c")
+    assert prompt_key("m", "a b c") != prompt_key("other", "a b c")
+
+
+def test_hit_from_memory_then_from_disk(cache):
+    cache.put("a", "answer", "chat", ttl=60)
+    assert cache.get("a", "chat") == "answer"
+    cache._memory.clear()
+    assert cache.get("a", "chat") == "answer"
+    assert cache.get("missing", "chat") is None
+    assert cache.stats()["chat"] == {"memory_hits": 1, "disk_hits": 1, "misses": 1}
+
+
+def test_zero_ttl_and_empty_responses_are_not_stored(cache):
+    cache.put("a", "answer", ttl=0)
+    cache.put("b", "", ttl=60)
+    assert cache.get("a") is None and cache.get("b") is None
+    assert rows(cache) == 0
+
+
+def test_expired_entries_are_misses_and_get_purged(cache, monkeypatch):
+    cache.put("old", "stale", ttl=10)
+    cache.put("new", "fresh", ttl=1000)
+    later = time.time() + 100
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert cache.get("old") is None
+    assert cache.get("new") == "fresh"
+
+    cache.purge_expired()
+    assert rows(cache) == 1
+
+
+def test_purge_runs_every_n_puts_and_caps_rows(tmp_path):
+    cache = LLMCache(str(tmp_path / "responses.sqlite3"), max_rows=3, purge_every=5)
+    for i in range(4):
+        cache.put(f"k{i}", "answer", ttl=60)
+    assert rows(cache) == 4
+    cache.put("k4", "answer", ttl=60)
+    assert rows(cache) == 3
+    cache._memory.clear()
+    assert cache.get("k0") is None and cache.get("k4") == "answer"
+
+
+def test_store_is_capped_when_opened(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = LLMCache(path)
+    for i in range(5):
+        cache.put(f"k{i}", "answer", ttl=60)
+    assert rows(LLMCache(path, max_rows=2)) == 2
+
+
+def test_read_errors_count_as_misses(cache):
+    cache.put("a", "answer", "chat", ttl=60)
+    cache._memory.clear()
+    cache._db.close()
+    cache._db = sqlite3.connect(":memory:", check_same_thread=False)
+    assert cache.get("a", "chat") is None
+    assert cache.stats()["chat"]["misses"] == 1
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+import match_engine
+from config import MATCH_MAX_K
+
+
+@pytest.mark.parametrize("k, expected", [(0, 1), (-1, 1), (5, 5), (10 ** 6, MATCH_MAX_K)])
+def test_clamp_k(k, expected):
+    assert match_engine.clamp_k(k) == expected
+
+
+class FakeCatalog:
+    titles = np.array([f"Job {i}" for i in range(10)])
+
+
+@pytest.mark.parametrize("k", [0, -1, 3])
+def test_batch_returns_between_one_and_k_matches(k, monkeypatch):
+    requested = []
+
+    def search(cv_texts, k, catalog):
+        requested.append(k)
+        return [(np.arange(k), np.full(k, 0.01))] * len(cv_texts)
+
+    monkeypatch.setattr(match_engine, "current_catalog", FakeCatalog)
+    monkeypatch.setattr(match_engine, "search_jobs_batch", search)
+    monkeypatch.setattr(match_engine, "select_matches", lambda *args, **kwargs: [])
+    results = match_engine.match_jobs_batch(["cv one", "cv two"], k=k)
+    assert requested == [max(k, 1)]
+    assert [len(matches) for matches in results] == [max(k, 1)] * 2
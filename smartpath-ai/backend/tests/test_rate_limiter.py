@@ -0,0 +1,93 @@
+import multiprocessing
+import threading
+import time
+
+from rate_limiter import RateLimiter
+
+
+def wait_for_queue(limiter, length, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while limiter.stats()["queued"] < length:
+        assert time.monotonic() < deadline, "waiters never queued"
+        time.sleep(0.005)
+
+
+def test_acquire_is_immediate_while_the_bucket_has_room():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    assert limiter.acquire(100) < 0.05
+    stats = limiter.stats()
+    assert stats["tokens_available"] <= 901 and stats["requests_available"] < 60
+
+
+def test_interactive_waiter_is_served_before_queued_background_work():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=10_000_000)  # 10 requests/s
+    limiter.requests.level = 0
+    order = []
+
+    def call(priority):
+        limiter.acquire(1, priority=priority, timeout=5)
+        order.append(priority)
+
+    background = [threading.Thread(target=call, args=("background",)) for _ in range(2)]
+    for thread in background:
+        thread.start()
+    wait_for_queue(limiter, 2)
+    interactive = threading.Thread(target=call, args=("interactive",))
+    interactive.start()
+    for thread in [*background, interactive]:
+        thread.join(5)
+
+    assert order[0] == "interactive"
+    assert order.count("background") == 2
+
+
+def test_acquire_times_out_and_leaves_the_queue():
+    limiter = RateLimiter(requests_per_minute=0.6, tokens_per_minute=1000)  # one request per 100 s
+    limiter.requests.level = 0
+    start = time.monotonic()
+    assert limiter.acquire(1, timeout=0.05) is None
+    assert time.monotonic() - start < 1
+    assert limiter.stats()["queued"] == 0
+
+
+def test_token_estimate_larger_than_the_bucket_is_capped():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100)
+    assert limiter.acquire(10_000, timeout=0.1) is not None
+
+
+def take_all(path, attempts, results):
+    limiter = RateLimiter(requests_per_minute=4, tokens_per_minute=1000, state_path=path)
+    results.put(sum(limiter.acquire(1, timeout=0.01) is not None for _ in range(attempts)))
+
+
+def test_limiters_sharing_a_state_file_share_one_quota(tmp_path):
+    path = str(tmp_path / "state" / "rate_limit.sqlite3")
+    first = RateLimiter(requests_per_minute=3, tokens_per_minute=1000, state_path=path)
+    second = RateLimiter(requests_per_minute=3, tokens_per_minute=1000, state_path=path)
+    assert first.acquire(1, timeout=0.01) is not None
+    assert second.acquire(1, timeout=0.01) is not None
+    assert first.acquire(1, timeout=0.01) is not None
+    assert second.acquire(1, timeout=0.01) is None
+    assert first.stats()["requests_available"] < 1
+
+
+def test_worker_processes_share_one_quota(tmp_path):
+    path = str(tmp_path / "rate_limit.sqlite3")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [context.Process(target=take_all, args=(path, 4, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    granted = sum(results.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join(10)
+    assert granted == 4
+
+
+def test_unusable_state_file_falls_back_to_process_buckets(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=1000, state_path=str(blocker / "state.sqlite3"))
+    assert limiter.acquire(1, timeout=0.01) is not None
+    assert limiter.acquire(1, timeout=0.01) is not None
+    assert limiter.acquire(1, timeout=0.01) is None
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import llm_gateway
+from llm_gateway import DeadlineExceededError, _single_flight, llm_deadline
+
+
+release = threading.Event()
+
+
+def coalesced(call_type):
+    return llm_gateway.get_metrics()["calls"].get(call_type, {}).get("coalesced", 0)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(n, key, call_type, func):
+    """Start n callers of one key; the first becomes the leader, the rest wait on it"""
+    before = coalesced(call_type)
+    with ThreadPoolExecutor(n) as pool:
+        futures = [pool.submit(_single_flight, key, call_type, func)]
+        wait_until(lambda: key in llm_gateway._inflight)
+        futures += [pool.submit(_single_flight, key, call_type, func) for _ in range(n - 1)]
+        wait_until(lambda: coalesced(call_type) - before == n - 1)
+        release.set()
+        return [future.exception() or future.result() for future in futures]
+
+
+@pytest.fixture(autouse=True)
+def reset_release():
+    release.clear()
+    yield
+    release.set()
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    before = coalesced("sf-share")
+    assert run_concurrently(4, "sf-share", "sf-share", func) == ["answer"] * 4
+    assert len(calls) == 1
+    assert coalesced("sf-share") - before == 3
+    assert "sf-share" not in llm_gateway._inflight
+
+
+def test_followers_receive_the_leaders_exception():
+    def func():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    results = run_concurrently(3, "sf-error", "sf-error", func)
+    assert all(isinstance(error, ValueError) for error in results)
+
+
+def test_next_call_after_completion_runs_again():
+    calls = []
+
+    def func():
+        calls.append(1)
+        return len(calls)
+
+    assert _single_flight("sf-again", "sf-again", func) == 1
+    assert _single_flight("sf-again", "sf-again", func) == 2
+
+
+def test_follower_gives_up_at_its_deadline():
+    leader_started = threading.Event()
+
+    def func():
+        leader_started.set()
+        release.wait(5)
+        return "late"
+
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(_single_flight, "sf-deadline", "sf-deadline", func)
+        leader_started.wait(5)
+        with llm_deadline(0.05), pytest.raises(DeadlineExceededError):
+            _single_flight("sf-deadline", "sf-deadline", func)
+        release.set()
+        assert leader.result() == "late"
@@ -0,0 +1,48 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import llm_gateway
+import skill_detector
+from llm_gateway import llm_deadline
+from skill_taxonomy import get_taxonomy
+
+
+class FakeCatalog:
+    def find(self, title):
+        required = get_taxonomy().skill_keys(["Python", "Kubernetes"])
+        return SimpleNamespace(description=f"{title} work", skills="Python;Kubernetes", required_skills=required)
+
+
+def analysis(title):
+    return {"have_skills": ["Python"], "missing_skills": [], "capability_score": 90, "reasoning": f"AI on {title}"}
+
+
+def test_batches_run_concurrently_under_the_request_deadline_and_rest_use_skill_matching(monkeypatch):
+    monkeypatch.setattr(skill_detector, "current_catalog", FakeCatalog)
+    monkeypatch.setattr(skill_detector, "CAPABILITY_BATCH_SIZE", 3)
+    monkeypatch.setattr(skill_detector, "CAPABILITY_MAX_JOBS", 6)
+    lock = threading.Lock()
+    running, peak, deadlines = [0], [0], []
+
+    def analyze_batch(cv_text, jobs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            deadlines.append(llm_gateway._deadline.get())
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+        return {job["title"].lower(): analysis(job["title"]) for job in jobs}
+
+    monkeypatch.setattr(skill_detector, "analyze_cv_for_jobs_batch", analyze_batch)
+    jobs = [{"title": f"Job {i}", "score": 80 - i} for i in range(8)]
+    with llm_deadline(20):
+        results = skill_detector.detect_skill_gaps("cv", jobs, cv_skills={"Python"})
+
+    assert peak[0] == 2
+    assert len(deadlines) == 2 and None not in deadlines
+    assert [result["title"] for result in results] == [job["title"] for job in jobs]
+    assert all(result["reasoning"].startswith("AI on") for result in results[:6])
+    assert all(result["reasoning"] == "Traditional skill matching analysis" for result in results[6:])
+    assert results[7]["have_skills"] == ["Python"] and results[7]["missing_skills"] == ["Kubernetes"]
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from match_engine import parse_ai_job_matches
+from structured_output import SchemaError, looks_like_json, parse_json
+
+PERSON = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}, "age": {"type": "integer"}, "tags": {"type": "array", "items": {"type": "string"}}},
+    "required": ["name"],
+}
+NAMES = {"type": "array", "items": {"type": "string"}}
+
+
+def test_parses_plain_and_fenced_json():
+    assert parse_json('{"name": "Ana", "age": 30}', PERSON) == {"name": "Ana", "age": 30}
+    assert parse_json('```json\n{"name": "Ana"}\n```', PERSON) == {"name": "Ana"}
+    assert parse_json('```\n["a", "b"]\n```', NAMES) == ["a", "b"]
+
+
+def test_unwraps_a_single_key_wrapper():
+    assert parse_json('{"names": ["a", "b"]}', NAMES) == ["a", "b"]
+    with pytest.raises(SchemaError):
+        parse_json('{"names": ["a"], "other": 1}', NAMES)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("not json", "Invalid JSON"),
+    ("", "Invalid JSON"),
+    ('{"age": 30}', "missing required field 'name'"),
+    ('{"name": "Ana", "age": "30"}', "$.age: expected integer"),
+    ('{"name": "Ana", "age": true}', "$.age: expected integer"),
+    ('{"name": "Ana", "tags": ["a", 1]}', "$.tags[1]: expected string"),
+])
+def test_schema_errors_name_the_problem(text, message):
+    with pytest.raises(SchemaError, match=message.replace("$", r"\$").replace("[", r"\[")):
+        parse_json(text, PERSON)
+
+
+def test_looks_like_json():
+    assert looks_like_json('  {"a": 1}') and looks_like_json("[1]") and looks_like_json("```json")
+    assert not looks_like_json("Data Analyst: 80") and not looks_like_json(None)
+
+
+def matches(*pairs):
+    return json.dumps([{"title": title, "score": score} for title, score in pairs])
+
+
+def test_job_matches_from_json_are_sorted_and_filtered():
+    response = matches(("Web Developer", 70), ("Data Analyst", 85.5), ("Chef", 20), ("  ", 90))
+    assert parse_ai_job_matches(response) == [
+        {"title": "Data Analyst", "score": 85.5},
+        {"title": "Web Developer", "score": 70.0},
+    ]
+
+
+def test_job_matches_accept_a_wrapped_list():
+    assert parse_ai_job_matches('{"jobs": ' + matches(("Data Analyst", 80)) + "}") == [
+        {"title": "Data Analyst", "score": 80.0}
+    ]
+
+
+def test_json_of_the_wrong_shape_yields_no_matches():
+    assert parse_ai_job_matches('[{"title": "Data Analyst", "score": "high"}]') == []
+    assert parse_ai_job_matches('{"title": "Data Analyst"}') == []
+
+
+def test_free_text_reply_is_parsed_line_by_line():
+    response = "Data Analyst: 85%\nWeb Developer: 25\nSome commentary without a score"
+    assert parse_ai_job_matches(response) == [{"title": "Data Analyst", "score": 85.0}]
+
+
+def test_unknown_titles_are_dropped_and_known_ones_use_catalog_spelling():
+    response = matches(("data analyst", 80), ("Astronaut", 95))
+    assert parse_ai_job_matches(response, candidate_titles=["Data Analyst", "Web Developer"]) == [
+        {"title": "Data Analyst", "score": 80.0}
+    ]
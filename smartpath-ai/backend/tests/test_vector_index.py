@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from vector_index import ExactIndex, IVFIndex, JobIndex, create_index, recall_at_k
+
+
+def unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def clustered_vectors(n, dim=16, clusters=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = unit_vectors(clusters, dim, seed + 1)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.05 * rng.standard_normal((n, dim)).astype(np.float32)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.mark.parametrize("kind", ["exact", "ivf"])
+def test_query_finds_the_vector_itself(kind):
+    vectors = unit_vectors(200)
+    index = create_index(kind, nprobe=200) if kind == "ivf" else create_index(kind)
+    index.build(vectors, np.arange(1000, 1200))
+    ids, scores = index.query(vectors[17], k=3)
+    assert ids[0] == 1017
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("kind", ["exact", "ivf"])
+def test_add_and_remove_keep_ids_and_vectors_aligned(kind):
+    vectors = unit_vectors(120)
+    index = create_index(kind).build(vectors[:100])
+    original = index.copy()
+
+    index.update(remove_ids=[3, 50], vectors=vectors[100:], ids=np.arange(100, 120))
+    expected = sorted(set(range(120)) - {3, 50})
+    assert sorted(index.ids.tolist()) == expected
+    np.testing.assert_allclose(index.get_vectors(expected), vectors[expected])
+
+    index.remove([100]).add(vectors[:1] * 1.0, [500])
+    assert 100 not in index.ids and 500 in index.ids
+    np.testing.assert_allclose(index.get_vectors([500]), vectors[:1])
+
+    # Copy-on-write: the copy taken before the updates is untouched
+    assert sorted(original.ids.tolist()) == list(range(100))
+    np.testing.assert_allclose(original.get_vectors(range(100)), vectors[:100])
+
+
+def test_ivf_add_to_empty_index_trains_it():
+    vectors = unit_vectors(50)
+    index = IVFIndex(nlist=4).build(np.empty((0, 16), dtype=np.float32))
+    index.add(vectors, np.arange(50))
+    assert len(index) == 50 and len(index.centroids) == 4
+
+
+def test_update_rejects_vectors_of_another_dimension():
+    index = ExactIndex().build(unit_vectors(10))
+    with pytest.raises(ValueError):
+        index.add(unit_vectors(2, dim=8), [10, 11])
+
+
+@pytest.mark.parametrize("kind", ["exact", "ivf"])
+def test_save_and_load_round_trip(kind, tmp_path):
+    vectors = unit_vectors(300)
+    index = create_index(kind).build(vectors)
+    index.remove([5]).add(unit_vectors(1, seed=9), [999])
+    index.fingerprint = "abc"
+    path = tmp_path / "index.npz"
+    index.save(path)
+
+    loaded = JobIndex.load(path)
+    assert loaded.kind == kind and loaded.fingerprint == "abc"
+    query = unit_vectors(1, seed=3)[0]
+    for a, b in zip(index.query(query, 10), loaded.query(query, 10)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_save_replaces_the_file_without_leaving_temporaries(tmp_path):
+    path = tmp_path / "index.npz"
+    create_index("exact").build(unit_vectors(10)).save(path)
+    create_index("exact").build(unit_vectors(20)).save(path)
+    assert len(JobIndex.load(path).ids) == 20
+    assert [p.name for p in tmp_path.iterdir()] == ["index.npz"]
+
+
+def test_ivf_recall_on_clustered_data():
+    vectors = clustered_vectors(2000)
+    index = IVFIndex(nlist=40).build(vectors)
+    queries = clustered_vectors(30, seed=7)
+    assert recall_at_k(index, queries, k=10) >= 0.9
+    assert recall_at_k(index, queries, k=10, nprobe=index.nlist) == 1.0
+
+
+def test_recall_of_exact_index_is_perfect():
+    vectors = unit_vectors(500)
+    assert recall_at_k(ExactIndex().build(vectors), unit_vectors(20, seed=5), k=10) == 1.0
+
+
+def test_default_nprobe_scales_with_nlist():
+    assert IVFIndex(nlist=40).probe_count() == 8
+    assert IVFIndex(nlist=400).probe_count() == 40
+    assert IVFIndex(nlist=400, nprobe=5).probe_count() == 5
+    assert IVFIndex(nlist=4).probe_count() == 4
@@ -1,6 +1,6 @@
 # Enhanced translator.py with Google AI
 import logging
-from config import GOOGLE_API_KEY, GEMINI_MODEL
+from llm_gateway import generate
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -14,13 +14,6 @@ def translate_text(text, target_lang):
         return text
 
     try:
-        # Try to import and use Google Generative AI
-        import google.generativeai as genai
-
-        # Configure the API
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-
         # Create translation prompt
         if target_lang == "rw":
             prompt = f"""
@@ -42,8 +35,7 @@ def translate_text(text, target_lang):
             """
 
         # Generate translation
-        response = model.generate_content(prompt)
-        translation = response.text.strip()
+        translation = generate(prompt, "translate").strip()
 
         logger.info(f"Successfully translated '{text}' to {target_lang}")
         return translation
@@ -83,11 +75,6 @@ def detect_language(text):
     Detect the language of the input text using Google AI
     """
     try:
-        import google.generativeai as genai
-
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-
         prompt = f"""
         Detect the language of the following text.
         Respond with only the language code (e.g., 'en' for English, 'rw' for Kinyarwanda, 'fr' for French).
@@ -97,8 +84,7 @@ def detect_language(text):
         Language code:
         """
 
-        response = model.generate_content(prompt)
-        language = response.text.strip().lower()
+        language = generate(prompt, "detect_language").strip().lower()
 
         return language if language in ['en', 'rw', 'fr'] else 'en'
 
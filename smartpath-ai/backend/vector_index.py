@@ -0,0 +1,402 @@
+"""
+Vector indexes for SmartPath AI job matching
+
+All indexes store L2-normalized float32 vectors under integer ids and answer
+top-k inner-product (cosine) queries:
+- ExactIndex: brute-force scan, perfect recall, linear cost
+- IVFIndex: inverted-file index over k-means cells, only the nprobe cells
+  closest to the query are scanned, trading recall for latency
+
+IVF recall depends heavily on the data: real text embeddings are clustered
+and reach near-perfect recall with a few percent of the cells scanned,
+while uniformly random vectors need most cells scanned. recall_at_k()
+measures it against a brute-force scan of the same vectors.
+"""
+import math
+import copy
+import json
+import logging
+import os
+
+import numpy as np
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def top_k(scores, k):
+    """
+    Positions of the k largest scores, best first, without sorting the full array
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        order = np.argsort(-scores, kind="stable")
+        return order if k is None else order[:k]
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def top_k_rows(scores, k):
+    """Row-wise top_k over a 2-D score matrix, best first in each row"""
+    n = scores.shape[1]
+    k = n if k is None else max(0, min(k, n))
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k else np.empty((len(scores), 0), dtype=np.int64)
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape)
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+class JobIndex:
+    """Common interface for job vector indexes"""
+
+    kind = None
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.dim = 0
+        self.fingerprint = None
+
+    def build(self, vectors, ids=None):
+        """Index the given vectors; ids default to their row positions"""
+        raise NotImplementedError
+
+    def query(self, vector, k=10, **params):
+        """
+        Find the k nearest vectors
+
+        Returns:
+            Tuple of (ids, scores) arrays sorted by descending score
+        """
+        raise NotImplementedError
+
+    def query_batch(self, vectors, k=10, **params):
+        """
+        Run query() for every row of a 2-D array
+
+        Returns:
+            List of (ids, scores) tuples, one per query row
+        """
+        return [self.query(vector, k, **params) for vector in np.asarray(vectors, dtype=np.float32)]
+
+    def add(self, vectors, ids):
+        """Insert vectors under the given ids without rebuilding"""
+        return self.update(vectors=vectors, ids=ids)
+
+    def remove(self, ids):
+        """Drop the vectors stored under the given ids"""
+        return self.update(remove_ids=ids)
+
+    def update(self, remove_ids=(), vectors=None, ids=None):
+        """
+        Drop the vectors stored under remove_ids and insert vectors under ids,
+        writing the stored vectors to new arrays once
+        """
+        raise NotImplementedError
+
+    def get_vectors(self, ids):
+        """Stored vectors for the given ids (all must be in the index)"""
+        order = np.argsort(self.ids, kind="stable")
+        return self.vectors[order[np.searchsorted(self.ids, ids, sorter=order)]]
+
+    def copy(self):
+        """
+        Cheap copy for copy-on-write updates: add() and remove() replace
+        arrays rather than writing into them, so the original stays valid
+        for concurrent readers
+        """
+        return copy.copy(self)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _prepare(vectors, ids):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError("vectors must be a 2-D array")
+        if ids is None:
+            ids = np.arange(len(vectors), dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+        return vectors, ids
+
+    def _changes(self, remove_ids, vectors, ids):
+        """Keep mask over the stored ids and the prepared new vectors for update()"""
+        if vectors is None:
+            vectors, ids = np.empty((0, self.dim), dtype=np.float32), None
+        vectors, ids = self._prepare(vectors, ids)
+        if len(ids) and len(self.ids) and vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d vectors, got {vectors.shape[1]}-d")
+        keep = ~np.isin(self.ids, np.asarray(remove_ids, dtype=np.int64))
+        return keep, vectors, ids
+
+    def _params(self):
+        return {}
+
+    def _arrays(self):
+        raise NotImplementedError
+
+    def save(self, path):
+        """
+        Save the index to a single .npz file
+
+        The file is written next to path and then renamed over it, so a worker
+        loading the index never sees a partially written file.
+        """
+        meta = {"kind": self.kind, "dim": self.dim, "fingerprint": self.fingerprint, "params": self._params()}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), ids=self.ids, **self._arrays())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index previously written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            index = INDEX_TYPES[meta["kind"]](**meta["params"])
+            index.dim = meta["dim"]
+            index.fingerprint = meta.get("fingerprint")
+            index.ids = data["ids"]
+            index._restore({name: data[name] for name in data.files if name not in ("meta", "ids")})
+        return index
+
+    def _restore(self, arrays):
+        raise NotImplementedError
+
+
+class ExactIndex(JobIndex):
+    """Brute-force index: one matrix-vector product over every vector"""
+
+    kind = "exact"
+
+    def __init__(self):
+        super().__init__()
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+
+    def build(self, vectors, ids=None):
+        self.vectors, self.ids = self._prepare(vectors, ids)
+        self.dim = self.vectors.shape[1] if len(self.vectors) else 0
+        return self
+
+    def update(self, remove_ids=(), vectors=None, ids=None):
+        keep, vectors, ids = self._changes(remove_ids, vectors, ids)
+        kept = int(keep.sum())
+        dim = vectors.shape[1] if len(ids) else self.dim
+        out = np.empty((kept + len(ids), dim), dtype=np.float32)
+        if kept:
+            np.compress(keep, self.vectors, axis=0, out=out[:kept])
+        out[kept:] = vectors
+        self.vectors, self.ids, self.dim = out, np.concatenate((self.ids[keep], ids)), dim
+        return self
+
+    def query(self, vector, k=10, **params):
+        if not len(self.ids):
+            return self.ids[:0], np.empty(0, dtype=np.float32)
+        scores = self.vectors @ np.asarray(vector, dtype=np.float32)
+        best = top_k(scores, k)
+        return self.ids[best], scores[best]
+
+    def query_batch(self, vectors, k=10, batch_size=256, **params):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(self.ids):
+            return [(self.ids[:0], np.empty(0, dtype=np.float32)) for _ in vectors]
+
+        # One matrix multiply per batch of queries, bounded to batch_size x n scores
+        results = []
+        for start in range(0, len(vectors), batch_size):
+            scores = vectors[start:start + batch_size] @ self.vectors.T
+            best = top_k_rows(scores, k)
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            results.extend(zip(self.ids[best], best_scores))
+        return results
+
+    def _arrays(self):
+        return {"vectors": self.vectors}
+
+    def _restore(self, arrays):
+        self.vectors = np.ascontiguousarray(arrays["vectors"], dtype=np.float32)
+
+
+class IVFIndex(JobIndex):
+    """
+    Inverted-file index
+
+    Vectors are clustered with spherical k-means into nlist cells and stored
+    grouped by cell. A query scores the centroids, then scans only the nprobe
+    best cells. Higher nprobe means better recall and slower queries;
+    nprobe=0 scans probe_fraction of the cells (at least 8), so the share
+    of the corpus scanned stays the same as nlist grows.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, nlist=0, nprobe=0, niter=10, train_size=256, seed=0, probe_fraction=0.1):
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.probe_fraction = probe_fraction
+        self.niter = niter
+        self.train_size = train_size
+        self.seed = seed
+        self.centroids = np.empty((0, 0), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+
+    def _params(self):
+        return {"nlist": self.nlist, "nprobe": self.nprobe, "niter": self.niter,
+                "train_size": self.train_size, "seed": self.seed, "probe_fraction": self.probe_fraction}
+
+    def probe_count(self, nprobe=None):
+        """Cells scanned per query for an nprobe setting (None = the index default)"""
+        nprobe = nprobe or self.nprobe or max(8, math.ceil(self.probe_fraction * self.nlist))
+        return max(1, min(nprobe, self.nlist))
+
+    def build(self, vectors, ids=None):
+        vectors, ids = self._prepare(vectors, ids)
+        n = len(vectors)
+        self.dim = vectors.shape[1] if n else 0
+        if not n:
+            self.ids, self.vectors = ids, vectors
+            self.centroids = np.empty((0, self.dim), dtype=np.float32)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return self
+
+        nlist = self.nlist or int(np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        self.nlist = nlist
+        self.centroids = self._train(vectors, nlist)
+
+        self._regroup(self._assign(vectors), vectors, ids)
+        logger.info(f"Built IVF index: {n} vectors in {nlist} cells")
+        return self
+
+    def _train(self, vectors, nlist):
+        """Spherical k-means on a sample of the vectors"""
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), nlist * self.train_size)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.niter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=nlist)
+
+            # Re-seed empty cells with random sample points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+
+        return centroids
+
+    def _assign(self, vectors, batch_size=65536):
+        """Nearest centroid for every vector, in batches to bound memory"""
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            chunk = vectors[start:start + batch_size]
+            out[start:start + batch_size] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return out
+
+    def _cells(self):
+        """Cell number of every stored vector"""
+        return np.repeat(np.arange(self.nlist), np.diff(self.offsets))
+
+    def _regroup(self, cells, vectors, ids):
+        """Store vectors grouped by cell and recompute the cell offsets"""
+        order = np.argsort(cells, kind="stable")
+        counts = np.bincount(cells, minlength=self.nlist)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.ids = ids[order]
+
+    def update(self, remove_ids=(), vectors=None, ids=None):
+        keep, vectors, ids = self._changes(remove_ids, vectors, ids)
+        if not len(self.centroids):
+            # Nothing to assign against yet: train on what we have
+            return self.build(vectors, ids) if len(ids) else self
+
+        # New vectors join their nearest existing cell; centroids are not retrained.
+        # Kept and new vectors are gathered straight into cell order.
+        n = len(self.ids)
+        cells = np.concatenate((self._cells()[keep], self._assign(vectors)))
+        order = np.argsort(cells, kind="stable")
+        source = np.concatenate((np.flatnonzero(keep), n + np.arange(len(ids))))[order]
+        old = source < n
+        out = np.empty((len(source), self.dim), dtype=np.float32)
+        out[old] = self.vectors[source[old]]
+        out[~old] = vectors[source[~old] - n]
+
+        counts = np.bincount(cells, minlength=self.nlist)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.vectors = out
+        self.ids = np.concatenate((self.ids, ids))[source]
+        return self
+
+    def query(self, vector, k=10, nprobe=None, **params):
+        if not len(self.ids):
+            return self.ids[:0], np.empty(0, dtype=np.float32)
+
+        vector = np.asarray(vector, dtype=np.float32)
+        cells = top_k(self.centroids @ vector, self.probe_count(nprobe))
+
+        positions = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells])
+        if not len(positions):
+            return self.ids[:0], np.empty(0, dtype=np.float32)
+
+        scores = self.vectors[positions] @ vector
+        best = top_k(scores, k)
+        return self.ids[positions[best]], scores[best]
+
+    def _arrays(self):
+        return {"centroids": self.centroids, "offsets": self.offsets, "vectors": self.vectors}
+
+    def _restore(self, arrays):
+        self.centroids = np.ascontiguousarray(arrays["centroids"], dtype=np.float32)
+        self.offsets = arrays["offsets"].astype(np.int64)
+        self.vectors = np.ascontiguousarray(arrays["vectors"], dtype=np.float32)
+
+
+INDEX_TYPES = {
+    ExactIndex.kind: ExactIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def recall_at_k(index, queries, k=10, **params):
+    """
+    Mean fraction of the exact top-k that index.query returns for each query
+
+    The reference is a brute-force scan of the vectors stored in the index
+    itself, so the result measures only the approximation. params are
+    passed to query() (e.g. nprobe) to compare settings.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    exact = ExactIndex().build(index.vectors, index.ids)
+    hits = 0
+    for query, (expected, _) in zip(queries, exact.query_batch(queries, k)):
+        found, _ = index.query(query, k, **params)
+        hits += len(np.intersect1d(found, expected))
+    return hits / max(1, sum(min(k, len(index)) for _ in queries))
+
+
+def create_index(kind="exact", **params):
+    """Instantiate an empty index of the given kind"""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}', expected one of {sorted(INDEX_TYPES)}")
+    return INDEX_TYPES[kind](**params)
@@ -30,8 +30,13 @@ def verify_backend_files():
         'skill_detector.py': 'Skill extraction and analysis',
         'translator.py': 'Translation services',
         'course_recommender.py': 'Course recommendations',
+        'embedding_model.py': 'Shared embedding model provider',
+        'embedding_cache.py': 'Embedding cache',
+        'vector_index.py': 'Job vector index',
+        'job_catalog.py': 'Shared job catalog',
         'jobs_dataset.csv': 'Jobs database',
-        'courses_dataset.csv': 'Courses database'
+        'courses_dataset.csv': 'Courses database',
+        'skills_taxonomy.csv': 'Skill taxonomy'
     }
     
     print("📁 Checking backend files...")